@@ -0,0 +1,139 @@
+import base64
+import io
+import shutil
+import tempfile
+from typing import Iterable, Optional
+
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.feed import fan_out_on_read_authors
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+from recipes.process_cache import expire_process_data
+from users.models import User
+
+
+def make_image_bytes(size: tuple[int, int] = (4, 4), color='red') -> bytes:
+    """Содержимое файла изображения PNG."""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_image(size: tuple[int, int] = (4, 4)) -> str:
+    """Изображение PNG в виде строки base64 для запросов к API."""
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(make_image_bytes(size)).decode()
+    )
+
+
+class APITestBase(APITestCase):
+    """
+    Общие данные и вспомогательные методы тестов API.
+
+    Создаются теги, ингредиенты, пользователь (user, аутентифицирован в
+    self.client) и автор. Файлы изображений сохраняются во временный
+    каталог, кеши очищаются и версии данных процесса перечитываются перед
+    каждым тестом.
+    """
+
+    INGREDIENTS_COUNT = 30
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_settings = override_settings(MEDIA_ROOT=cls._media_root)
+        cls._media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_settings.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}',
+                color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(3)
+        ]
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(cls.INGREDIENTS_COUNT)
+        )
+        cls.user = cls.create_user('user')
+        cls.author = cls.create_user('author')
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        expire_process_data()
+        fan_out_on_read_authors.expire()
+        self.client.force_authenticate(self.user)
+
+    @classmethod
+    def create_user(cls, username: str) -> User:
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            first_name=username,
+            last_name=username,
+            password='password',
+        )
+
+    @classmethod
+    def create_recipe(
+        cls,
+        author: User,
+        ingredients_count: int = 3,
+        tags: Optional[Iterable[Tag]] = None,
+    ) -> Recipe:
+        """Рецепт с ingredients_count ингредиентами и тегами."""
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in cls.ingredients[:ingredients_count]
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag)
+            for tag in (cls.tags[:1] if tags is None else tags)
+        )
+        Recipe.objects.filter(pk=recipe.pk).update_tags_index()
+        return recipe
+
+    def request_queries(self, method: str, url: str, **kwargs):
+        """Ответ на запрос и число выполненных при этом запросов к базе."""
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(context.captured_queries)
+
+    def recipe_payload(self, ingredients_count: int = 3) -> dict:
+        """Данные запроса на создание рецепта."""
+        return {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 2}
+                for ingredient in self.ingredients[:ingredients_count]
+            ],
+            'tags': [self.tags[0].pk, self.tags[1].pk],
+            'image': make_image(),
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
@@ -0,0 +1,205 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.routers import DefaultRouter
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+
+from api.v1.recipes.urls import router
+from recipes.models import FavoritesList, ShoppingCart
+
+from .base import APITestBase
+
+
+with override_settings(ASYNC_READ_VIEWS=True):
+    async_router = DefaultRouter()
+    for prefix, viewset, basename in router.registry:
+        async_router.register(prefix, viewset, basename=basename)
+    urlpatterns = [path('api/', include(async_router.urls))]
+
+
+class AsyncReadViewsTest(APITestBase):
+    """
+    Асинхронные list и retrieve (ASYNC_READ_VIEWS).
+
+    Каждый запрос выполняется синхронным представлением и асинхронным
+    (AsyncClient с URL из urlpatterns этого модуля): статус, тело ответа и
+    число запросов к базе данных должны совпадать.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = [
+            cls.create_recipe(cls.author, ingredients_count=count)
+            for count in (2, 4)
+        ]
+        FavoritesList.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+
+    def get_sync(self, url: str, authenticated: bool, **headers):
+        """Ответ синхронного представления и число запросов."""
+        if authenticated:
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.token.key}'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **headers)
+        return response, len(context.captured_queries)
+
+    def get_async(self, url: str, authenticated: bool, **headers):
+        """Ответ асинхронного представления и число запросов."""
+        if authenticated:
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.token.key}'
+        headers = {
+            name.removeprefix('HTTP_').replace('_', '-'): value
+            for name, value in headers.items()
+        }
+        with self.settings(ROOT_URLCONF=__name__):
+            with CaptureQueriesContext(connection) as context:
+                response = async_to_sync(self.async_client.get)(
+                    url,
+                    headers=headers,
+                )
+        return response, len(context.captured_queries)
+
+    def assertSameResponse(
+        self,
+        url: str,
+        authenticated: bool = False,
+        **headers,
+    ):
+        """Ответы и число запросов совпадают; возвращает тело ответа."""
+        self.get_sync(url, authenticated, **headers)
+        sync_response, sync_count = self.get_sync(
+            url,
+            authenticated,
+            **headers,
+        )
+        async_response, async_count = self.get_async(
+            url,
+            authenticated,
+            **headers,
+        )
+        self.assertEqual(
+            async_response.status_code,
+            sync_response.status_code,
+        )
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(async_count, sync_count)
+        return sync_response
+
+    def test_views_are_async(self):
+        """Асинхронными становятся только представления list и retrieve."""
+        patterns = zip(router.urls, async_router.urls)
+        for sync_pattern, async_pattern in patterns:
+            actions = getattr(sync_pattern.callback, 'actions', {}).values()
+            self.assertFalse(
+                asyncio.iscoroutinefunction(sync_pattern.callback),
+            )
+            self.assertEqual(
+                asyncio.iscoroutinefunction(async_pattern.callback),
+                any(action in ('list', 'retrieve') for action in actions),
+                async_pattern.name,
+            )
+
+    def test_recipe_list(self):
+        """Список рецептов анонимного пользователя."""
+        response = self.assertSameResponse('/api/recipes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_recipe_list_authenticated(self):
+        """Поля is_favorited и is_in_shopping_cart совпадают."""
+        response = self.assertSameResponse('/api/recipes/', True)
+        results = {
+            recipe['id']: (
+                recipe['is_favorited'],
+                recipe['is_in_shopping_cart'],
+            )
+            for recipe in response.json()['results']
+        }
+        self.assertEqual(
+            results,
+            {
+                self.recipes[0].pk: (True, False),
+                self.recipes[1].pk: (False, True),
+            },
+        )
+
+    def test_recipe_list_filtered(self):
+        """Фильтр is_favorited применяется так же."""
+        response = self.assertSameResponse(
+            '/api/recipes/?is_favorited=1',
+            True,
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.recipes[0].pk],
+        )
+
+    def test_recipe_retrieve(self):
+        """Рецепт авторизованного и анонимного пользователя."""
+        url = f'/api/recipes/{self.recipes[1].pk}/'
+        response = self.assertSameResponse(url, True)
+        self.assertTrue(response.json()['is_in_shopping_cart'])
+        response = self.assertSameResponse(url)
+        self.assertFalse(response.json()['is_in_shopping_cart'])
+
+    def test_recipe_retrieve_not_found(self):
+        """Несуществующий рецепт - 404."""
+        for url in ('/api/recipes/0/', '/api/recipes/abc/'):
+            response = self.assertSameResponse(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sync_action_permissions(self):
+        """Синхронные действия асинхронного представления проверяют права."""
+        response = self.assertSameResponse('/api/recipes/feed/')
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_invalid_token(self):
+        """Неверный токен отклоняется до выполнения действия."""
+        response = self.assertSameResponse(
+            '/api/recipes/',
+            HTTP_AUTHORIZATION='Token invalid',
+        )
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_tags(self):
+        """Список тегов и тег по id."""
+        response = self.assertSameResponse('/api/tags/')
+        self.assertEqual(len(response.json()), 3)
+        response = self.assertSameResponse(f'/api/tags/{self.tags[1].pk}/')
+        self.assertEqual(response.json()['slug'], 'tag1')
+        response = self.assertSameResponse('/api/tags/0/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ingredients(self):
+        """Каталог ингредиентов, поиск и ингредиент по id."""
+        response = self.assertSameResponse(
+            '/api/ingredients/',
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.assertSameResponse(
+            '/api/ingredients/?name=ингредиент 1',
+        )
+        self.assertEqual(len(response.json()), 11)
+        response = self.assertSameResponse(
+            f'/api/ingredients/{self.ingredients[0].pk}/',
+        )
+        self.assertEqual(response.json()['id'], self.ingredients[0].pk)
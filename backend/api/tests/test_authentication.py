@@ -0,0 +1,92 @@
+from unittest import mock
+
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+
+from django.test import override_settings
+
+from api.v1.authentication import CachedTokenAuthentication, token_users
+from api.v1.users.views import UserViewSet
+
+from .base import APITestBase
+
+
+@override_settings(AUTH_TOKEN_CACHE_ENABLED=True)
+class CachedTokenAuthenticationTest(APITestBase):
+    """Кеш пользователей токенов: что хранится и когда он сбрасывается."""
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self, key=None):
+        return self.authentication.authenticate_credentials(
+            key or self.token.key,
+        )
+
+    def test_cache_holds_user_fields_without_password(self):
+        """В кеше поля пользователя, но не хеш его пароля."""
+        self.authenticate()
+        cached = token_users.get(self.token.key)
+        self.assertEqual(cached['id'], self.user.pk)
+        self.assertEqual(cached['email'], self.user.email)
+        self.assertNotIn('password', cached)
+
+    def test_cache_hit_without_queries(self):
+        """При попадании в кеш пользователь собирается без запросов."""
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.username, self.user.username)
+            self.assertTrue(user.is_authenticated)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_uncached_fields_are_loaded_on_access(self):
+        """Пароль не кешируется и загружается при проверке."""
+        self.authenticate()
+        user, _ = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('password'))
+
+    def test_deactivation_is_applied_on_cache_hit(self):
+        """Деактивация пользователя действует сразу."""
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_token_is_rejected(self):
+        """После удаления токена (выход) он больше не принимается."""
+        key = self.token.key
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(key)
+
+    def test_user_change_invalidates_tokens(self):
+        """Изменение пользователя сбрасывает его токены в кеше."""
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new-password')
+            self.user.save()
+        self.assertIsNone(token_users.get(self.token.key))
+
+    def test_me_query_budget(self):
+        """Профиль с закешированным токеном - один запрос."""
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with mock.patch.object(
+            UserViewSet,
+            'authentication_classes',
+            [CachedTokenAuthentication],
+        ):
+            self.client.get('/api/users/me/')
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.user.pk)
@@ -0,0 +1,121 @@
+from rest_framework import status
+
+from django.test import override_settings
+
+from recipes.models import DataVersion, Ingredient, Tag
+from recipes.tag_registry import TAG_REGISTRY_VERSION_KEY
+
+from .base import APITestBase
+
+
+class ProcessDataTest(APITestBase):
+    """Реестр тегов, индекс и каталог ингредиентов в памяти процесса."""
+
+    def test_search_in_empty_index(self):
+        """Поиск по пустому индексу ингредиентов возвращает пустой список."""
+        Ingredient.objects.all().delete()
+        response = self.client.get('/api/ingredients/?name=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+
+    def test_search_sees_new_ingredient(self):
+        """Новый ингредиент находится сразу после сохранения."""
+        self.client.get('/api/ingredients/?name=соль')
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        response = self.client.get('/api/ingredients/?name=соль')
+        self.assertEqual(
+            [item['name'] for item in response.json()],
+            ['Соль'],
+        )
+
+    def test_catalog_is_rebuilt_after_change(self):
+        """После изменения ингредиентов меняется ETag каталога."""
+        etag = self.client.get('/api/ingredients/')['ETag']
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        response = self.client.get('/api/ingredients/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), self.INGREDIENTS_COUNT + 1)
+
+    def test_tags_are_rebuilt_after_change(self):
+        """Новый тег появляется в списке тегов."""
+        self.client.get('/api/tags/')
+        Tag.objects.create(name='Новый', color='#FFFFFF', slug='new')
+        response = self.client.get('/api/tags/')
+        self.assertIn('new', [tag['slug'] for tag in response.json()])
+
+    def test_etag_depends_on_encoding(self):
+        """У сжатых представлений каталога разные ETag."""
+        etags = {
+            encoding: self.client.get(
+                '/api/ingredients/',
+                HTTP_ACCEPT_ENCODING=encoding,
+            )['ETag']
+            for encoding in ('identity', 'gzip', 'br')
+        }
+        self.assertEqual(len(set(etags.values())), 3, etags)
+        response = self.client.get(
+            '/api/ingredients/',
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=etags['gzip'],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(
+            '/api/ingredients/',
+            HTTP_ACCEPT_ENCODING='br',
+            HTTP_IF_NONE_MATCH=etags['gzip'],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+
+class ProcessDataQueriesTest(APITestBase):
+    """Версия данных процесса читается не чаще PROCESS_DATA_VERSION_TTL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_recipe(cls.author, tags=cls.tags[:1])
+
+    def test_warm_tags_without_queries(self):
+        """Список тегов после первого запроса не обращается к базе."""
+        self.client.get('/api/tags/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/')
+        self.assertEqual(len(response.json()), len(self.tags))
+
+    def test_tags_filter_without_registry_queries(self):
+        """Фильтр по тегам не добавляет запросов к списку рецептов."""
+        self.client.get('/api/recipes/?tags=tag0')
+        _, count = self.request_queries('get', '/api/recipes/')
+        with self.assertNumQueries(count):
+            response = self.client.get('/api/recipes/?tags=tag0&tags=tag1')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_warm_ingredient_search_without_queries(self):
+        """Автодополнение ингредиентов после первого запроса без запросов."""
+        self.client.get('/api/ingredients/?name=ингредиент')
+        for name in ('и', 'ин', 'ингредиент 2'):
+            with self.subTest(name=name):
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        '/api/ingredients/',
+                        {'name': name},
+                    )
+                self.assertTrue(response.json())
+
+    def test_version_changed_elsewhere_is_read_after_ttl(self):
+        """Смена версии другим процессом видна после истечения TTL."""
+        self.client.get('/api/tags/')
+        Tag.objects.bulk_create(
+            [Tag(name='Новый', color='#FFFFFF', slug='new')],
+        )
+        DataVersion.objects.filter(
+            name=TAG_REGISTRY_VERSION_KEY,
+        ).update(
+            version='other',
+        )
+        response = self.client.get('/api/tags/')
+        self.assertNotIn('new', [tag['slug'] for tag in response.json()])
+        with override_settings(PROCESS_DATA_VERSION_TTL=0):
+            response = self.client.get('/api/tags/')
+        self.assertIn('new', [tag['slug'] for tag in response.json()])
@@ -0,0 +1,137 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.feed import backfill_resumed_authors, fan_out_on_read_authors
+from recipes.models import FeedEntry
+from users.models import Follow, User
+
+from .base import APITestBase
+
+
+@override_settings(
+    FEED_FANOUT_MAX_FOLLOWERS=1,
+    FEED_FANOUT_RESUME_FOLLOWERS=1,
+    FEED_READ_AUTHORS_TTL=0,
+)
+class FeedFanOutModeTest(APITestBase):
+    """Лента при смене режима автора (запись в ленты или при чтении)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_user = cls.create_user('other')
+        cls.first_recipe = cls.create_recipe(cls.author)
+
+    def feed_ids(self) -> list[int]:
+        response = self.client.get('/api/recipes/feed/')
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_author_switches_to_read_mode(self):
+        """При превышении порога рецепты автора добавляются при чтении."""
+        Follow.objects.create(follower=self.user, following=self.author)
+        Follow.objects.create(follower=self.other_user, following=self.author)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.fan_out_on_read)
+        recipe = self.create_recipe(self.author)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        self.assertEqual(self.feed_ids(), [recipe.pk, self.first_recipe.pk])
+
+    def test_recipe_stays_in_feed_after_switch_back(self):
+        """
+        Рецепт, опубликованный в режиме чтения, остается в ленте после
+        возврата автора к записи в ленты.
+        """
+        Follow.objects.create(follower=self.user, following=self.author)
+        Follow.objects.create(follower=self.other_user, following=self.author)
+        recipe = self.create_recipe(self.author)
+        Follow.objects.filter(follower=self.other_user).delete()
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.fan_out_on_read)
+        self.assertIsNotNone(self.author.feed_backfill_requested)
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.user, recipe=recipe).exists(),
+        )
+        self.assertEqual(self.feed_ids(), [recipe.pk, self.first_recipe.pk])
+        self.assertEqual(backfill_resumed_authors(), 1)
+        self.author.refresh_from_db()
+        self.assertIsNone(self.author.feed_backfill_requested)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, recipe=recipe).exists(),
+        )
+        self.assertEqual(self.feed_ids(), [recipe.pk, self.first_recipe.pk])
+
+    @override_settings(FEED_FANOUT_RESUME_FOLLOWERS=0)
+    def test_recipe_stays_in_feed_below_threshold(self):
+        """
+        Автор остается в режиме чтения, пока подписчиков больше
+        FEED_FANOUT_RESUME_FOLLOWERS, и его рецепты не пропадают из ленты.
+        """
+        Follow.objects.create(follower=self.user, following=self.author)
+        Follow.objects.create(follower=self.other_user, following=self.author)
+        recipe = self.create_recipe(self.author)
+        Follow.objects.filter(follower=self.other_user).delete()
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.fan_out_on_read)
+        self.assertEqual(self.feed_ids(), [recipe.pk, self.first_recipe.pk])
+
+    def test_subscribe_through_manager_updates_mode(self):
+        """Подписка через менеджер связи тоже меняет режим автора."""
+        self.author.user_followers.add(self.user, self.other_user)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.fan_out_on_read)
+        recipe = self.create_recipe(self.author)
+        self.assertEqual(self.feed_ids(), [recipe.pk, self.first_recipe.pk])
+
+
+class FeedQueriesTest(APITestBase):
+    """Запросы ленты, подписки и отписки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipe(cls.author)
+
+    def test_feed_without_read_authors_skips_follows(self):
+        """
+        Без авторов с добавлением при чтении подписки не читаются, а с
+        ними их рецепты выбираются одним запросом.
+        """
+        Follow.objects.create(follower=self.user, following=self.author)
+        self.client.get('/api/recipes/feed/')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipe.pk],
+        )
+        follow_selects = [
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].startswith(f'SELECT "{Follow._meta.db_table}"')
+        ]
+        self.assertEqual(follow_selects, [])
+        User.objects.filter(
+            pk=self.create_user('popular').pk,
+        ).update(
+            fan_out_on_read=True,
+        )
+        fan_out_on_read_authors.expire()
+        fan_out_on_read_authors.get()
+        _, count = self.request_queries('get', '/api/recipes/feed/')
+        self.assertEqual(count, len(context.captured_queries) + 1)
+
+    def test_follow_does_not_lock_author(self):
+        """Режим лент меняется запросом счетчика, без блокировок."""
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        for method in ('post', 'delete'):
+            with self.subTest(method=method):
+                with CaptureQueriesContext(connection) as context:
+                    getattr(self.client, method)(url)
+                user_writes = [
+                    query['sql']
+                    for query in context.captured_queries
+                    if query['sql'].startswith('UPDATE "users_user"')
+                    or 'FOR UPDATE' in query['sql']
+                ]
+                self.assertEqual(len(user_writes), 2, user_writes)
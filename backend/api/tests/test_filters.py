@@ -0,0 +1,154 @@
+import re
+from importlib import import_module
+
+from rest_framework import status
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+
+from api.v1.recipes.filters import RecipeFilterSet
+from recipes.models import Ingredient, Recipe, Tag
+
+from .base import APITestBase
+
+
+class TagsFilterTest(APITestBase):
+    """Фильтрация рецептов по слагам тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first = cls.create_recipe(cls.author, tags=cls.tags[:1])
+        cls.both = cls.create_recipe(cls.author, tags=cls.tags[:2])
+
+    def filter_ids(self, query: str) -> set[int]:
+        response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_tags_modes(self):
+        """Режим any - хотя бы один из тегов, all - все теги."""
+        self.assertEqual(
+            self.filter_ids('tags=tag0&tags=tag1'),
+            {self.first.pk, self.both.pk},
+        )
+        self.assertEqual(
+            self.filter_ids('tags=tag0&tags=tag1&tags_mode=all'),
+            {self.both.pk},
+        )
+
+    def test_unknown_slug_is_rejected(self):
+        """Несуществующий слаг - ошибка валидации."""
+        response = self.client.get('/api/recipes/?tags=unknown')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tag_deleted_after_validation(self):
+        """Тег, удаленный после проверки слагов, не вызывает ошибку."""
+        for mode, expected in (('any', {self.both.pk}), ('all', set())):
+            with self.subTest(mode=mode):
+                tag = Tag.objects.create(
+                    name=mode,
+                    color='#FFFFFF',
+                    slug=mode,
+                )
+                filterset = RecipeFilterSet(
+                    data={'tags': ['tag1', tag.slug], 'tags_mode': mode},
+                    queryset=Recipe.objects.all(),
+                )
+                self.assertTrue(filterset.form.is_valid())
+                tag.delete()
+                self.assertEqual(
+                    {recipe.pk for recipe in filterset.qs},
+                    expected,
+                )
+
+
+class TagsIndexTest(APITestBase):
+    """Денормализованный индекс тегов рецепта."""
+
+    def test_recipe_delete_does_not_update_index(self):
+        """Удаление рецепта не пересчитывает его индекс тегов."""
+        recipe = self.create_recipe(self.author, tags=self.tags)
+        with CaptureQueriesContext(connection) as context:
+            recipe.delete()
+        recipe_updates = [
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].startswith(
+                f'UPDATE "{Recipe._meta.db_table}"',
+            )
+        ]
+        self.assertEqual(recipe_updates, [])
+
+    def test_tag_delete_updates_index(self):
+        """Удаление тега убирает его из индекса рецептов."""
+        recipe = self.create_recipe(self.author, tags=self.tags[:2])
+        self.tags[0].delete()
+        recipe.refresh_from_db()
+        self.assertEqual(set(recipe.tags_index), {str(self.tags[1].pk)})
+
+
+class NameSearchSqlTest(APITestBase):
+    """
+    Поиск по названию использует выражения индексов миграции
+    recipes.0003_name_search_indexes: LOWER(name) в условии LIKE и в
+    сортировке, без UPPER(...) из icontains/istartswith.
+    """
+
+    def lower_name(self, table: str) -> str:
+        """Индексируемое выражение LOWER(name) в SQL таблицы table."""
+        migration = import_module(
+            'recipes.migrations.0003_name_search_indexes',
+        )
+        self.assertIn(
+            (table, 'gin (LOWER(name) gin_trgm_ops)'),
+            [index[1:] for index in migration.NAME_SEARCH_INDEXES],
+        )
+        quote_name = connection.ops.quote_name
+        return f'LOWER({quote_name(table)}.{quote_name("name")})'
+
+    def assertUsesLowerName(self, sql: str, table: str):
+        lower_name = self.lower_name(table)
+        self.assertRegex(
+            sql,
+            rf'WHERE \(?{re.escape(lower_name)}(::text)? LIKE',
+        )
+        self.assertNotIn('UPPER(', sql)
+
+    def get_sql(self, queryset: QuerySet) -> str:
+        with CaptureQueriesContext(connection) as context:
+            list(queryset)
+        return context.captured_queries[-1]['sql']
+
+    def test_ingredient_search(self):
+        """Поиск и сортировка ингредиентов по LOWER(name)."""
+        sql = self.get_sql(
+            Ingredient.objects.search_name(
+                'Ингр',
+            ).order_by_is_startswith_value(
+                'Ингр',
+            ),
+        )
+        self.assertUsesLowerName(sql, Ingredient._meta.db_table)
+        self.assertRegex(
+            sql,
+            rf'ORDER BY .*{re.escape(self.lower_name("recipes_ingredient"))}',
+        )
+
+    def test_recipe_search(self):
+        """Поиск рецептов по LOWER(name)."""
+        sql = self.get_sql(Recipe.objects.search_name('Рец'))
+        self.assertUsesLowerName(sql, Recipe._meta.db_table)
+
+    def test_ingredient_view_search(self):
+        """Ингредиент по id с параметром name ищется по LOWER(name)."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                f'/api/ingredients/{self.ingredients[1].pk}/?name=1',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertUsesLowerName(
+            context.captured_queries[-1]['sql'],
+            Ingredient._meta.db_table,
+        )
@@ -0,0 +1,125 @@
+import io
+
+from django.contrib.admin import site
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import RequestFactory
+
+from recipes.models import ImageJob, MediaFile, Recipe
+from recipes.storage import get_recipe_image_storage
+from users.models import User
+
+from .base import APITestBase, make_image_bytes
+
+
+class AdminImageReplacementTest(APITestBase):
+    """Замена изображения рецепта в админ-зоне."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(self.author)
+        self.recipe.image.save('old.png', ContentFile(make_image_bytes()))
+        self.old_name = self.recipe.image.name
+        self.model_admin = site._registry[Recipe]
+        self.request = RequestFactory().post('/')
+        self.request.user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password',
+        )
+
+    def save_in_admin(self, **files):
+        form_class = self.model_admin.get_form(
+            self.request,
+            self.recipe,
+            change=True,
+        )
+        form = form_class(
+            data={
+                'author': self.author.pk,
+                'name': self.recipe.name,
+                'text': self.recipe.text,
+                'cooking_time': self.recipe.cooking_time,
+            },
+            files=files,
+            instance=self.recipe,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        recipe = form.save(commit=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.model_admin.save_model(self.request, recipe, form, True)
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_new_image_is_processed_and_old_released(self):
+        """Новое изображение ставится в очередь, прежнее освобождается."""
+        self.recipe.image_variants = {'small': {'png': self.old_name}}
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_variants=self.recipe.image_variants,
+            image_placeholder='data:image/jpeg;base64,',
+        )
+        recipe = self.save_in_admin(
+            image=SimpleUploadedFile(
+                'new.png',
+                make_image_bytes(color='blue'),
+                content_type='image/png',
+            ),
+        )
+        self.assertNotEqual(recipe.image.name, self.old_name)
+        self.assertEqual(recipe.image_status, Recipe.ImageStatus.PROCESSING)
+        self.assertEqual(recipe.image_variants, {})
+        self.assertEqual(recipe.image_placeholder, '')
+        self.assertTrue(
+            ImageJob.objects.filter(
+                recipe=recipe,
+                source=recipe.image.name,
+            ).exists(),
+        )
+        self.assertFalse(MediaFile.objects.filter(name=self.old_name).exists())
+        self.assertFalse(recipe.image.storage.exists(self.old_name))
+
+    def test_unchanged_image_is_kept(self):
+        """Без нового изображения файлы и задания не меняются."""
+        recipe = self.save_in_admin()
+        self.assertEqual(recipe.image.name, self.old_name)
+        self.assertFalse(ImageJob.objects.filter(recipe=recipe).exists())
+        self.assertTrue(MediaFile.objects.filter(name=self.old_name).exists())
+
+
+class SweepMediaFilesTest(APITestBase):
+    """Удаление файлов, оставшихся после отката транзакции."""
+
+    def save_and_rollback(self) -> str:
+        storage = get_recipe_image_storage()
+        try:
+            with transaction.atomic():
+                name = storage.save(
+                    'recipes/images/orphan.png',
+                    ContentFile(make_image_bytes(color='green')),
+                )
+                raise DatabaseError
+        except DatabaseError:
+            pass
+        return name
+
+    def test_orphan_is_deleted(self):
+        """Файл без записи MediaFile удаляется, учтенные - остаются."""
+        storage = get_recipe_image_storage()
+        kept = storage.save(
+            'recipes/images/kept.png',
+            ContentFile(make_image_bytes()),
+        )
+        orphan = self.save_and_rollback()
+        self.assertTrue(storage.exists(orphan))
+        call_command('sweep_media_files', min_age=-60, stdout=io.StringIO())
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(kept))
+        self.assertFalse(MediaFile.objects.filter(name=orphan).exists())
+
+    def test_recent_orphan_is_kept(self):
+        """Недавно записанный файл не удаляется."""
+        orphan = self.save_and_rollback()
+        call_command('sweep_media_files', stdout=io.StringIO())
+        self.assertTrue(get_recipe_image_storage().exists(orphan))
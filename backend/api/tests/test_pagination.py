@@ -0,0 +1,108 @@
+import base64
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from rest_framework import status
+
+from django.utils.timezone import now
+
+from recipes.models import Recipe
+from users.models import Follow
+
+from .base import APITestBase
+
+
+class CursorPaginationTest(APITestBase):
+    """Курсорный режим списков рецептов и подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        recipes = [cls.create_recipe(cls.author) for _ in range(7)]
+        pub_date = now()
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes[1:5]],
+        ).update(
+            pub_date=pub_date,
+        )
+        cls.expected_ids = list(
+            Recipe.objects.order_by(
+                '-pub_date',
+                '-id',
+            ).values_list(
+                'pk',
+                flat=True,
+            ),
+        )
+
+    def walk(self, url: str, link: str) -> tuple[list[list[int]], str]:
+        """Id на страницах при переходах по ссылкам link; последний ответ."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([item['id'] for item in response.data['results']])
+            last_url, url = url, response.data[link]
+        return pages, last_url
+
+    def test_pages_cover_all_recipes_with_equal_dates(self):
+        """Страницы идут по (pub_date, id) без пропусков и повторов."""
+        pages, last_url = self.walk('/api/recipes/?cursor=&limit=2', 'next')
+        self.assertEqual(sum(pages, []), self.expected_ids)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        response = self.client.get(last_url)
+        previous_pages, _ = self.walk(response.data['previous'], 'previous')
+        self.assertEqual(previous_pages, pages[-2::-1])
+
+    def test_cursor_queries_do_not_count(self):
+        """Курсорная страница выбирается без подсчета количества."""
+        response = self.client.get('/api/recipes/?cursor=&limit=2')
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+
+    def test_invalid_cursor(self):
+        """Неверный курсор - ошибка 404."""
+        for cursor in ('abc', 'eyJ2YWx1ZXMiOiBbMV19'):
+            response = self.client.get(f'/api/recipes/?cursor={cursor}')
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_404_NOT_FOUND,
+                cursor,
+            )
+
+    def test_subscriptions_cursor(self):
+        """Подписки в курсорном режиме упорядочены по id автора."""
+        authors = [self.create_user(f'author{number}') for number in range(5)]
+        Follow.objects.bulk_create(
+            Follow(follower=self.user, following=author)
+            for author in authors
+        )
+        pages, _ = self.walk(
+            '/api/users/subscriptions/?cursor=&limit=2',
+            'next',
+        )
+        self.assertEqual(sum(pages, []), [author.pk for author in authors])
+
+    def test_feed_cursor(self):
+        """Лента листается курсором того же формата, что и рецепты."""
+        Follow.objects.create(follower=self.user, following=self.author)
+        pages, _ = self.walk('/api/recipes/feed/?limit=2', 'next')
+        self.assertEqual(sum(pages, []), self.expected_ids)
+        response = self.client.get('/api/recipes/feed/?limit=2')
+        self.assertIsNone(response.data['previous'])
+        cursor = json.loads(
+            base64.urlsafe_b64decode(
+                parse_qs(urlsplit(response.data['next']).query)['cursor'][0],
+            ),
+        )
+        self.assertEqual(cursor['values'][1], self.expected_ids[1])
+        self.assertFalse(cursor['reverse'])
+        cursor['reverse'] = True
+        reverse_cursor = base64.urlsafe_b64encode(
+            json.dumps(cursor).encode(),
+        ).decode()
+        response = self.client.get(
+            '/api/recipes/feed/',
+            {'cursor': reverse_cursor},
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,282 @@
+from rest_framework import status
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FavoritesList
+
+from .base import APITestBase
+
+
+class RecipeQueriesTest(APITestBase):
+    """Число запросов при чтении рецептов не зависит от их содержимого."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for ingredients_count in range(1, 11):
+            cls.create_recipe(
+                cls.author,
+                ingredients_count=ingredients_count,
+                tags=cls.tags[:ingredients_count % 3 + 1],
+            )
+
+    def _count_queries(self, url: str) -> int:
+        """Число запросов при чтении с заполненными кешами."""
+        self.client.get(url)
+        response, count = self.request_queries('get', url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return count
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        """Список рецептов: число запросов одинаково для любого limit."""
+        counts = {
+            limit: self._count_queries(f'/api/recipes/?limit={limit}')
+            for limit in (1, 5, 10)
+        }
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_list_query_budget(self):
+        """
+        Список: количество, рецепты, авторы, ингредиенты, теги и id
+        рецептов в избранном и списке покупок пользователя.
+        """
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/recipes/?limit=10')
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_retrieve_query_budget(self):
+        """Рецепт: те же запросы, что и для списка, кроме количества."""
+        recipe = self.author.recipes.order_by('-pk').first()
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(len(response.data['ingredients']), 10)
+
+    def test_create_response_queries_do_not_depend_on_ingredients(self):
+        """Ответ на создание рецепта строится одинаковым числом запросов."""
+        self.client.post('/api/recipes/', self.recipe_payload(), format='json')
+        counts = {}
+        for ingredients_count in (1, 10, 25):
+            response, count = self.request_queries(
+                'post',
+                '/api/recipes/',
+                data=self.recipe_payload(ingredients_count),
+                format='json',
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(
+                len(response.data['ingredients']),
+                ingredients_count,
+            )
+            counts[ingredients_count] = count
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+
+@override_settings(PAGINATION_COUNT_CACHE_ENABLED=True)
+class RecipeCountCacheTest(APITestBase):
+    """Закешированное количество рецептов в списке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_recipe(cls.author)
+
+    def test_count_is_cached(self):
+        """Повторный запрос списка не считает количество рецептов."""
+        _, first = self.request_queries('get', '/api/recipes/')
+        _, second = self.request_queries('get', '/api/recipes/')
+        self.assertEqual(second, first - 1)
+
+    def test_count_is_invalidated_after_commit(self):
+        """Новый рецепт учитывается в количестве после фиксации."""
+        self.assertEqual(self.client.get('/api/recipes/').data['count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipe(self.author)
+        self.assertEqual(self.client.get('/api/recipes/').data['count'], 2)
+
+
+class RecipeCountQueriesTest(APITestBase):
+    """Количество рецептов считается без повторной фильтрации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.favorite = cls.create_recipe(cls.author)
+        cls.create_recipe(cls.author)
+        FavoritesList.objects.create(user=cls.user, recipe=cls.favorite)
+
+    def test_filters_are_applied_once(self):
+        """Фильтр по избранному загружает избранное один раз."""
+        _, count = self.request_queries('get', '/api/recipes/')
+        response, filtered_count = self.request_queries(
+            'get',
+            '/api/recipes/?is_favorited=1',
+        )
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(filtered_count, count + 1)
+
+    def test_count_query_is_plain(self):
+        """Подсчет не сортирует и не соединяет таблицы."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/recipes/?tags=tag0')
+        count_query = next(
+            query['sql']
+            for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        )
+        self.assertNotIn('JOIN', count_query)
+        self.assertNotIn('ORDER BY', count_query)
+
+
+class RecipeWriteQueriesTest(APITestBase):
+    """Изменение рецепта записывает только разницу ингредиентов и тегов."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def test_partial_update_queries_do_not_depend_on_ingredients(self):
+        """Замена всех ингредиентов выполняется одинаковым числом запросов."""
+        counts = {}
+        for count in (2, 5, 15):
+            recipe = self.create_recipe(self.author, ingredients_count=count)
+            response, counts[count] = self.request_queries(
+                'patch',
+                f'/api/recipes/{recipe.pk}/',
+                data={
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': 3}
+                        for ingredient in self.ingredients[count:count * 2]
+                    ],
+                    'tags': [self.tags[2].pk],
+                },
+                format='json',
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['ingredients']), count)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_partial_update_without_relations_query_budget(self):
+        """
+        Изменение только полей рецепта: рецепт, предыдущий автор, UPDATE,
+        две точки сохранения (4 запроса) и ответ (6 запросов).
+        """
+        recipe = self.create_recipe(self.author, ingredients_count=5)
+        rows = set(recipe.recipe_ingredients.values_list('pk', 'amount'))
+        with self.assertNumQueries(13):
+            response = self.client.patch(
+                f'/api/recipes/{recipe.pk}/',
+                {'name': 'Новое название'},
+                format='json',
+            )
+        self.assertEqual(response.data['name'], 'Новое название')
+        self.assertEqual(
+            set(recipe.recipe_ingredients.values_list('pk', 'amount')),
+            rows,
+        )
+
+    def test_partial_update_keeps_unchanged_rows(self):
+        """Строки неизменных ингредиентов сохраняются, меняется количество."""
+        recipe = self.create_recipe(self.author, ingredients_count=3)
+        rows = dict(
+            recipe.recipe_ingredients.values_list('ingredient_id', 'pk'),
+        )
+        response = self.client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 7}
+                    for ingredient in self.ingredients[1:4]
+                ],
+                'tags': [self.tags[0].pk],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updated = {
+            ingredient_id: (pk, amount)
+            for ingredient_id, pk, amount in (
+                recipe.recipe_ingredients.values_list(
+                    'ingredient_id',
+                    'pk',
+                    'amount',
+                )
+            )
+        }
+        self.assertEqual(
+            set(updated),
+            {ingredient.pk for ingredient in self.ingredients[1:4]},
+        )
+        for ingredient in self.ingredients[1:3]:
+            self.assertEqual(
+                updated[ingredient.pk],
+                (rows[ingredient.pk], 7),
+            )
+
+
+class RecipeRelationsValidationTest(APITestBase):
+    """Проверка списков первичных ключей связанных объектов."""
+
+    def test_null_tag_is_rejected(self):
+        """Пустое значение в списке тегов отклоняется как null."""
+        payload = self.recipe_payload()
+        payload['tags'] = [None]
+        response = self.client.post('/api/recipes/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [error.code for error in response.data['tags']],
+            ['null'],
+        )
+
+    def test_null_recipe_in_batch_is_rejected(self):
+        """Пустое значение в пакетном добавлении отклоняется как null."""
+        response = self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [None]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [error.code for error in response.data['recipes']],
+            ['null'],
+        )
+
+
+class RecipeActionQueriesTest(APITestBase):
+    """Действия с рецептом загружают только нужные им поля."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipe(cls.author)
+
+    def test_foreign_recipe_is_forbidden_after_one_query(self):
+        """Изменение и удаление чужого рецепта отклоняются за один запрос."""
+        url = f'/api/recipes/{self.recipe.pk}/'
+        for method in ('patch', 'delete'):
+            with self.subTest(method=method):
+                with self.assertNumQueries(1):
+                    response = getattr(self.client, method)(
+                        url,
+                        {'name': 'Новое название'},
+                        format='json',
+                    )
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_403_FORBIDDEN,
+                )
+
+    def test_favorite_query_budget(self):
+        """
+        Добавление в избранное: рецепт и INSERT в точке сохранения
+        (4 запроса); удаление - выборка записей для сигналов удаления и
+        DELETE в точке сохранения (4 запроса).
+        """
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        with self.assertNumQueries(4):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(4):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
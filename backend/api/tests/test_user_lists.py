@@ -0,0 +1,227 @@
+from rest_framework import status
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import (
+    FavoritesList,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+)
+from recipes.user_recipe_ids import (
+    favorite_recipe_ids,
+    shopping_cart_recipe_ids,
+)
+
+from .base import APITestBase
+
+
+@override_settings(USER_RECIPE_IDS_CACHE_ENABLED=True)
+class UserRecipeIdsTest(APITestBase):
+    """Закешированные множества id рецептов избранного и покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipe(cls.author)
+
+    def test_favorite_invalidates_cached_ids(self):
+        """После добавления и удаления рецепта множество перечитывается."""
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.assertEqual(favorite_recipe_ids.get(self.user.pk), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            favorite_recipe_ids.get(self.user.pk),
+            {self.recipe.pk},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(favorite_recipe_ids.get(self.user.pk), frozenset())
+
+    def test_stale_load_does_not_overwrite_invalidation(self):
+        """
+        Множество, загруженное до фиксации изменения списка и записанное
+        в кеш после сброса, не читается.
+        """
+        favorite_recipe_ids.get(self.user.pk)
+        version = favorite_recipe_ids.cache.get(
+            favorite_recipe_ids._get_version_key(self.user.pk),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            FavoritesList.objects.create(user=self.user, recipe=self.recipe)
+        favorite_recipe_ids.cache.set(
+            favorite_recipe_ids._get_key(self.user.pk, version),
+            frozenset(),
+        )
+        self.assertEqual(
+            favorite_recipe_ids.get(self.user.pk),
+            {self.recipe.pk},
+        )
+
+    def test_cached_ids_are_read_without_queries(self):
+        """Повторное чтение множества не обращается к базе данных."""
+        favorite_recipe_ids.get(self.user.pk)
+        with self.assertNumQueries(0):
+            favorite_recipe_ids.get(self.user.pk)
+
+
+@override_settings(USER_RECIPE_IDS_CACHE_ENABLED=True)
+class ShoppingCartTest(APITestBase):
+    """Агрегат списка покупок при добавлении и удалении рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = [
+            cls.create_recipe(cls.author, ingredients_count=count)
+            for count in (2, 4)
+        ]
+
+    def shopping_list(self) -> dict[int, tuple[int, int]]:
+        return {
+            ingredient_id: (amount, recipes_count)
+            for ingredient_id, amount, recipes_count in (
+                ShoppingListItem.objects.filter(
+                    user=self.user,
+                ).values_list(
+                    'ingredient_id',
+                    'amount',
+                    'recipes_count',
+                )
+            )
+        }
+
+    def add_recipes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/recipes/shopping_cart/',
+                {'recipes': [recipe.pk for recipe in self.recipes]},
+                format='json',
+            )
+
+    def test_batch_remove_refreshes_shopping_list(self):
+        """Пакетное удаление пересчитывает агрегат и сбрасывает кеш."""
+        self.add_recipes()
+        self.assertEqual(len(self.shopping_list()), 4)
+        self.assertEqual(
+            shopping_cart_recipe_ids.get(self.user.pk),
+            {recipe.pk for recipe in self.recipes},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                '/api/recipes/shopping_cart/',
+                {'recipes': [self.recipes[1].pk]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        ingredients = self.ingredients
+        self.assertEqual(
+            self.shopping_list(),
+            {ingredients[0].pk: (1, 1), ingredients[1].pk: (1, 1)},
+        )
+        self.assertEqual(
+            shopping_cart_recipe_ids.get(self.user.pk),
+            {self.recipes[0].pk},
+        )
+
+    def test_remove_is_one_delete(self):
+        """Рецепты удаляются из списка одним DELETE."""
+        self.add_recipes()
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                self.client.delete(
+                    f'/api/recipes/{self.recipes[0].pk}/shopping_cart/',
+                )
+        cart_deletes = [
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].startswith('DELETE')
+            and ShoppingCart._meta.db_table in query['sql']
+        ]
+        self.assertEqual(len(cart_deletes), 1, cart_deletes)
+        self.assertFalse(
+            ShoppingCart.objects.filter(recipe=self.recipes[0]).exists(),
+        )
+        self.assertEqual(self.shopping_list()[self.ingredients[3].pk][1], 1)
+
+    def test_remove_skips_per_row_receivers(self):
+        """Число запросов удаления не зависит от числа рецептов."""
+        extra = self.create_recipe(self.author, ingredients_count=3)
+        recipe_ids = [recipe.pk for recipe in (*self.recipes, extra)]
+        counts = []
+        for recipes in ([self.recipes[0]], [self.recipes[0], extra]):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    '/api/recipes/shopping_cart/',
+                    {'recipes': recipe_ids},
+                    format='json',
+                )
+                response, count = self.request_queries(
+                    'delete',
+                    '/api/recipes/shopping_cart/',
+                    data={'recipes': [recipe.pk for recipe in recipes]},
+                    format='json',
+                )
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            counts.append(count)
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(
+            self.shopping_list(),
+            {ingredient.pk: (1, 1) for ingredient in self.ingredients[:4]},
+        )
+
+    def test_add_does_not_load_recipe(self):
+        """Сохранение записи списка покупок не загружает сам рецепт."""
+        with CaptureQueriesContext(connection) as context:
+            ShoppingCart.objects.create(
+                user_id=self.user.pk,
+                recipe_id=self.recipes[1].pk,
+            )
+        recipe_selects = [
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{Recipe._meta.db_table}"' in query['sql']
+        ]
+        self.assertEqual(recipe_selects, [])
+        self.assertEqual(len(self.shopping_list()), 4)
+
+    def test_recipe_delete_refreshes_shopping_list(self):
+        """Удаление рецепта пересчитывает агрегат списков покупок."""
+        self.add_recipes()
+        other_user = self.create_user('other')
+        ShoppingCart.objects.create(user=other_user, recipe=self.recipes[1])
+        self.recipes[1].delete()
+        ingredients = self.ingredients
+        self.assertEqual(
+            self.shopping_list(),
+            {ingredients[0].pk: (1, 1), ingredients[1].pk: (1, 1)},
+        )
+        self.assertFalse(
+            ShoppingListItem.objects.filter(user=other_user).exists(),
+        )
+
+    def test_recipe_delete_queries_do_not_depend_on_ingredients(self):
+        """Число запросов удаления рецепта не зависит от ингредиентов."""
+        self.client.force_authenticate(self.author)
+        counts = {}
+        for count in (1, 10):
+            recipe = self.create_recipe(self.author, ingredients_count=count)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            response, counts[count] = self.request_queries(
+                'delete',
+                f'/api/recipes/{recipe.pk}/',
+            )
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_author_delete_refreshes_shopping_list(self):
+        """Удаление автора убирает его рецепты из списков покупок."""
+        self.add_recipes()
+        self.author.delete()
+        self.assertEqual(self.shopping_list(), {})
@@ -0,0 +1,122 @@
+from rest_framework import status
+
+from django.test import override_settings
+
+from users.models import Follow
+
+from .base import APITestBase
+
+
+@override_settings(SUBSCRIPTION_RECIPES_LIMIT=3)
+class SubscriptionsTest(APITestBase):
+    """Список подписок с последними рецептами авторов."""
+
+    AUTHORS_COUNT = 4
+    RECIPES_COUNT = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.authors = [
+            cls.create_user(f'author{number}')
+            for number in range(cls.AUTHORS_COUNT)
+        ]
+        cls.recipes = {
+            author.pk: [
+                cls.create_recipe(author, ingredients_count=1)
+                for _ in range(cls.RECIPES_COUNT)
+            ]
+            for author in cls.authors
+        }
+        Follow.objects.bulk_create(
+            Follow(follower=cls.user, following=author)
+            for author in cls.authors
+        )
+
+    def get_subscriptions(self, **params):
+        response = self.client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def test_queries_do_not_depend_on_page(self):
+        """
+        Страница подписок загружается за 3 запроса (число подписок,
+        авторы и их рецепты) при любом размере страницы и recipes_limit.
+        """
+        counts = {}
+        for limit, recipes_limit in ((1, 1), (2, 2), (4, 3)):
+            response, counts[limit, recipes_limit] = self.request_queries(
+                'get',
+                '/api/users/subscriptions/',
+                data={'limit': limit, 'recipes_limit': recipes_limit},
+            )
+            self.assertEqual(len(response.data['results']), limit)
+        self.assertEqual(set(counts.values()), {3}, counts)
+
+    def test_latest_recipes_of_each_author(self):
+        """У каждого автора его последние recipes_limit рецептов."""
+        for subscription in self.get_subscriptions(recipes_limit=2):
+            self.assertEqual(
+                [recipe['id'] for recipe in subscription['recipes']],
+                [
+                    recipe.pk
+                    for recipe in self.recipes[subscription['id']][:-3:-1]
+                ],
+            )
+            self.assertEqual(
+                subscription['recipes_count'],
+                self.RECIPES_COUNT,
+            )
+
+    def test_recipes_limit_is_capped(self):
+        """recipes_limit ограничивается SUBSCRIPTION_RECIPES_LIMIT."""
+        for recipes_limit, expected in (
+            ('100', 3),
+            ('abc', 3),
+            (None, 3),
+            ('-1', 0),
+            ('0', 0),
+        ):
+            with self.subTest(recipes_limit=recipes_limit):
+                params = {}
+                if recipes_limit is not None:
+                    params['recipes_limit'] = recipes_limit
+                for subscription in self.get_subscriptions(**params):
+                    self.assertEqual(len(subscription['recipes']), expected)
+
+    def test_anonymous_is_unauthorized(self):
+        """Анонимному пользователю список подписок недоступен."""
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserActionQueriesTest(APITestBase):
+    """Число запросов действий с пользователями."""
+
+    def test_read_actions_query_budget(self):
+        """Профиль и пользователь - один запрос, список - два."""
+        for url, budget in (
+            ('/api/users/me/', 1),
+            (f'/api/users/{self.author.pk}/', 1),
+            ('/api/users/', 2),
+        ):
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_subscribe_queries_are_stable(self):
+        """Повторные подписка и отписка выполняют то же число запросов."""
+        self.create_recipe(self.author)
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        counts = []
+        for _ in range(2):
+            for method, code in (
+                ('post', status.HTTP_201_CREATED),
+                ('delete', status.HTTP_204_NO_CONTENT),
+            ):
+                response, count = self.request_queries(method, url)
+                self.assertEqual(response.status_code, code)
+                counts.append(count)
+        self.assertEqual(counts[:2], counts[2:])
@@ -0,0 +1,120 @@
+import hashlib
+from typing import Any, Iterable, Optional
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+
+
+User = get_user_model()
+
+TOKEN_USER_KEY = 'auth_token_user:{digest}'
+# Поля пользователя в кеше. Пароль, время входа, счетчики и режим ленты
+# (последние меняются через QuerySet.update) не кешируются и загружаются
+# из базы данных при обращении к ним.
+CACHED_USER_FIELDS = (
+    'id',
+    'username',
+    'email',
+    'first_name',
+    'last_name',
+    'is_active',
+    'is_staff',
+    'is_superuser',
+    'date_joined',
+)
+# Запись-заглушка после сброса: не дает запросу, начатому до сброса,
+# снова положить пользователя в кеш.
+INVALIDATED = False
+INVALIDATED_TIMEOUT = 60
+
+
+class TokenUserCache:
+    """
+    Поля пользователя по ключу токена в общем кеше.
+
+    Для токена хранятся поля CACHED_USER_FIELDS его пользователя не
+    дольше AUTH_TOKEN_CACHE_TIMEOUT секунд; ключи кеша строятся по
+    SHA-256 токена. Хеш пароля в кеш не попадает.
+
+    При сбросе (см. invalidate) запись заменяется заглушкой. Кеш
+    используется только с общим для всех процессов бэкендом
+    (AUTH_TOKEN_CACHE_ENABLED), поэтому сброс виден всем воркерам сразу.
+    """
+
+    @staticmethod
+    def _get_key(token_key: str) -> str:
+        return TOKEN_USER_KEY.format(
+            digest=hashlib.sha256(token_key.encode()).hexdigest(),
+        )
+
+    def get(self, token_key: str) -> Optional[dict[str, Any]]:
+        """Поля пользователя токена или None при промахе."""
+        return cache.get(self._get_key(token_key)) or None
+
+    def set(self, token_key: str, user: User) -> None:
+        """Сохранение пользователя токена, если токен не был сброшен."""
+        cache.add(
+            self._get_key(token_key),
+            {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+            timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+    def invalidate(self, token_keys: Iterable[str]) -> None:
+        """Сброс записей токенов."""
+        cache.set_many(
+            {self._get_key(token_key): INVALIDATED for token_key in token_keys},
+            timeout=INVALIDATED_TIMEOUT,
+        )
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Сброс всех токенов пользователя."""
+        self.invalidate(
+            Token.objects.filter(
+                user_id=user_id,
+            ).values_list(
+                'key',
+                flat=True,
+            ),
+        )
+
+
+token_users = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену без запросов к базе данных.
+
+    Пользователь токена собирается из полей в TokenUserCache, остальные
+    его поля откладываются (deferred) и загружаются при обращении. Запись
+    кеша сбрасывается при удалении токена (выход, удаление пользователя)
+    и при сохранении пользователя, в том числе при смене пароля и
+    деактивации, см. api.v1.signals. Изменения пользователя через
+    QuerySet.update (без сохранения модели) действуют после истечения
+    AUTH_TOKEN_CACHE_TIMEOUT. Включается в настройках только при общем
+    кеше (AUTH_TOKEN_CACHE_ENABLED).
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_users.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_users.set(key, user)
+            return user, token
+        # Model.from_db ожидает значения в порядке полей модели.
+        field_names = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in cached
+        ]
+        user = User.from_db(
+            router.db_for_read(User),
+            field_names,
+            [cached[name] for name in field_names],
+        )
+        return user, Token(key=key, user=user)
@@ -0,0 +1,27 @@
+from typing import Any
+
+from rest_framework import serializers
+
+from django.core.files.storage import default_storage
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Ссылки на уменьшенные копии изображения.
+
+    Значение поля модели (имена файлов по размеру и расширению)
+    преобразуется в ссылки; при наличии запроса в контексте ссылки
+    абсолютные, как у ImageField.
+    """
+
+    def to_representation(self, value: dict[str, dict[str, str]]) -> Any:
+        request = self.context.get('request')
+        representation: dict[str, dict[str, str]] = {}
+        for variant, names in value.items():
+            representation[variant] = {}
+            for extension, name in names.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                representation[variant][extension] = url
+        return representation
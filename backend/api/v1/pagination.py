@@ -1,4 +1,56 @@
+import base64
+import binascii
+import hashlib
+import json
+import uuid
+from typing import Any, ClassVar, Optional, Sequence
+
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Field, Model, Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+from django.utils.translation import gettext_lazy as _
+
+from recipes.feed import read_feed
+from recipes.models import Recipe
+
+
+COUNT_VERSION_KEY = 'pagination_count_version:{scope}'
+COUNT_KEY = 'pagination_count:{scope}:{version}:{params}'
+
+
+def get_count_version(scope: str) -> str:
+    """Текущая версия закешированных количеств объектов для области."""
+    return cache.get_or_set(
+        COUNT_VERSION_KEY.format(scope=scope),
+        uuid.uuid4().hex,
+        timeout=None,
+    )
+
+
+def invalidate_count_cache(scope: str) -> None:
+    """
+    Сброс закешированных количеств объектов через смену версии.
+
+    Вызывается после фиксации изменений: количество, посчитанное до нее,
+    записывается в кеш под старой версией и больше не читается.
+    """
+    if settings.PAGINATION_COUNT_CACHE_ENABLED:
+        cache.set(
+            COUNT_VERSION_KEY.format(scope=scope),
+            uuid.uuid4().hex,
+            timeout=None,
+        )
 
 
 class PageLimitPagination(pagination.PageNumberPagination):
@@ -6,3 +58,347 @@ class PageLimitPagination(pagination.PageNumberPagination):
 
     page_query_param = 'page'
     page_size_query_param = 'limit'
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор, количество объектов для которого считает get_count."""
+
+    def __init__(self, object_list, per_page, get_count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.get_count = get_count
+
+    @cached_property
+    def count(self) -> int:
+        return self.get_count()
+
+
+class CachedCountPagination(PageLimitPagination):
+    """
+    Пагинатор с облегченным и кешируемым подсчетом количества объектов.
+
+    Количество считается по отфильтрованному queryset страницы без
+    сортировки и выбираемых полей (неиспользуемые аннотации и prefetch
+    в подсчет не попадают), фильтры повторно не применяются. Если у
+    вьюсета задан count_cache_scope, результат кешируется для каждого
+    набора параметров фильтрации; кеш сбрасывается сменой версии области
+    (invalidate_count_cache). Версии хранятся в общем кеше, поэтому
+    кеширование включается только с общим для всех процессов бэкендом
+    (PAGINATION_COUNT_CACHE_ENABLED). Параметры из count_cache_user_params
+    делают ключ кеша зависимым от пользователя.
+
+    Для таблиц без фильтрации на PostgreSQL, в которых по оценке
+    планировщика не меньше PAGINATION_COUNT_ESTIMATE_THRESHOLD строк,
+    используется эта оценка, а в ответе передается count_approximate.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        self.request = request
+        self.count_approximate = False
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountedPaginator(
+            object_list,
+            per_page,
+            get_count=lambda: self.get_count(object_list),
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_approximate'] = self.count_approximate
+        return response
+
+    def get_count(self, queryset: QuerySet) -> int:
+        """Количество объектов с учетом кеша."""
+        scope = getattr(self.view, 'count_cache_scope', None)
+        if scope is None or not settings.PAGINATION_COUNT_CACHE_ENABLED:
+            return self._count(self._get_count_queryset(queryset))
+        key = self._get_cache_key(scope)
+        cached = cache.get(key)
+        if cached is None:
+            cached = (
+                self._count(self._get_count_queryset(queryset)),
+                self.count_approximate,
+            )
+            cache.set(
+                key,
+                cached,
+                timeout=settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+            )
+        count, self.count_approximate = cached
+        return count
+
+    def _get_count_queryset(self, queryset: QuerySet) -> QuerySet:
+        """Облегченный набор объектов для подсчета количества."""
+        return queryset.order_by().values('pk')
+
+    def _get_cache_key(self, scope: str) -> str:
+        """Ключ кеша для версии области и параметров фильтрации."""
+        ignored_params = (
+            self.page_query_param,
+            self.page_size_query_param,
+            getattr(self, 'cursor_query_param', None),
+        )
+        params = sorted(
+            (key, sorted(values))
+            for key, values in self.request.query_params.lists()
+            if key not in ignored_params
+        )
+        user_params = getattr(self.view, 'count_cache_user_params', ())
+        if any(key in user_params for key, _ in params):
+            params.append(('user', [str(self.request.user.pk)]))
+        digest = hashlib.md5(
+            urlencode(params, doseq=True).encode(),
+        ).hexdigest()
+        return COUNT_KEY.format(
+            scope=scope,
+            version=get_count_version(scope),
+            params=digest,
+        )
+
+    def _count(self, queryset: QuerySet) -> int:
+        """Точное количество или оценка планировщика для больших таблиц."""
+        if not queryset.query.where:
+            estimate = self._estimate_count(queryset.model, queryset.db)
+            if estimate >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+                self.count_approximate = True
+                return estimate
+        return queryset.count()
+
+    def _estimate_count(self, model: type[Model], using: str) -> int:
+        """Оценка числа строк таблицы по статистике PostgreSQL."""
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return max(row[0], 0) if row else 0
+
+
+class LimitCursorPagination(pagination.BasePagination):
+    """
+    Курсорный пагинатор по составному ключу с параметром limit.
+
+    Порядок записей берется из атрибута cursor_ordering вьюсета, последнее
+    поле порядка должно быть уникальным. Курсор содержит значения всех
+    полей ключа у граничной записи страницы и направление перехода;
+    следующая страница выбирается условием (a, b) < (x, y), записанным
+    как a <= x AND (a < x OR (a = x AND b < y)), и индексом по полям
+    порядка без OFFSET. В ответе возвращаются ссылки next и previous.
+    """
+
+    cursor_query_param: ClassVar[str] = 'cursor'
+    page_size_query_param: ClassVar[str] = 'limit'
+    max_page_size: ClassVar[Optional[int]] = None
+    invalid_cursor_message = _('Неверный курсор.')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(view.cursor_ordering)
+        self.fields = [
+            self._get_field(queryset.model, name.lstrip('-'))
+            for name in self.ordering
+        ]
+        page_size = self.get_page_size(request)
+        values, reverse = self._decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._invert(name) for name in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        self.next_values = self.previous_values = None
+        if results and has_next:
+            self.next_values = self._get_values(results[-1])
+        if results and has_previous:
+            self.previous_values = self._get_values(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                'next': self._get_link(self.next_values, reverse=False),
+                'previous': self._get_link(
+                    self.previous_values,
+                    reverse=True,
+                ),
+                'results': data,
+            },
+        )
+
+    def get_page_size(self, request) -> int:
+        try:
+            return pagination._positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    @staticmethod
+    def _get_field(model: type[Model], name: str) -> Field:
+        if name == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    @staticmethod
+    def _invert(name: str) -> str:
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _get_values(self, obj: Model) -> list[Any]:
+        """Значения полей ключа у записи."""
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def _after(self, ordering: Sequence[str], values: Sequence[Any]) -> Q:
+        """Условие для записей, следующих за ключом values в порядке."""
+        lookups = [
+            (name.lstrip('-'), 'lt' if name.startswith('-') else 'gt')
+            for name in ordering
+        ]
+        condition = Q()
+        equal: dict[str, Any] = {}
+        for (name, lookup), value in zip(lookups, values):
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first_name, first_lookup = lookups[0]
+        bound = Q(**{f'{first_name}__{first_lookup}e': values[0]})
+        return bound & condition
+
+    def _decode_cursor(self, request) -> tuple[Optional[list[Any]], bool]:
+        """Значения ключа и направление из курсора (None - первая страница)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = cursor['values']
+            if len(values) != len(self.fields):
+                raise ValueError
+            return (
+                [
+                    field.to_python(value)
+                    for field, value in zip(self.fields, values)
+                ],
+                bool(cursor['reverse']),
+            )
+        except (
+            binascii.Error,
+            DjangoValidationError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_link(
+        self,
+        values: Optional[list[Any]],
+        reverse: bool,
+    ) -> Optional[str]:
+        if values is None:
+            return None
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(
+                {
+                    'values': [
+                        value.isoformat() if hasattr(value, 'isoformat')
+                        else value
+                        for value in values
+                    ],
+                    'reverse': reverse,
+                },
+            ).encode(),
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encoded,
+        )
+
+
+class CursorModeMixin:
+    """
+    Курсорный режим для постраничного пагинатора.
+
+    Если в запросе передан параметр cursor (в том числе пустой для первой
+    страницы), записи выбираются по ключу сортировки из cursor_ordering
+    вьюсета без OFFSET и COUNT(*), а в ответе возвращаются непрозрачные
+    ссылки next/previous. Иначе работает постраничный режим.
+    """
+
+    cursor_query_param: ClassVar[str] = 'cursor'
+
+    def __init__(self) -> None:
+        self.cursor_paginator: Optional[LimitCursorPagination] = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = LimitCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset,
+                request,
+                view,
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class PageLimitCursorPagination(CursorModeMixin, PageLimitPagination):
+    """Пагинатор с параметрами page и limit и курсорным режимом."""
+
+
+class CachedCountCursorPagination(CursorModeMixin, CachedCountPagination):
+    """Пагинатор с кешируемым количеством объектов и курсорным режимом."""
+
+
+class FeedPagination(LimitCursorPagination):
+    """
+    Курсорный пагинатор ленты подписок.
+
+    Страница выбирается функцией recipes.feed.read_feed после позиции
+    (дата публикации и id рецепта) из курсора того же формата, что и у
+    LimitCursorPagination. Лента читается только вперед, поэтому в ответе
+    есть ссылка next, а previous всегда пуста.
+    """
+
+    max_page_size: ClassVar[int] = 100
+
+    def paginate_feed(self, request, user_id: int) -> list[int]:
+        """Id рецептов страницы ленты пользователя."""
+        self.request = request
+        self.fields = [
+            self._get_field(Recipe, name)
+            for name in ('pub_date', 'pk')
+        ]
+        page_size = self.get_page_size(request)
+        values, reverse = self._decode_cursor(request)
+        if reverse:
+            raise NotFound(self.invalid_cursor_message)
+        positions = read_feed(
+            user_id,
+            page_size + 1,
+            None if values is None else tuple(values),
+        )
+        self.next_values = self.previous_values = None
+        if len(positions) > page_size:
+            self.next_values = list(positions[page_size - 1])
+        return [recipe_id for _, recipe_id in positions[:page_size]]
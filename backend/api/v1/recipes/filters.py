@@ -1,8 +1,12 @@
 import django_filters
 
-from django.db.models import Subquery
-
-from recipes.models import Recipe, Tag
+from recipes.models import Recipe
+from recipes.tag_registry import tag_registry, tag_slug_choices
+from recipes.user_recipe_ids import (
+    UserRecipeIds,
+    favorite_recipe_ids,
+    shopping_cart_recipe_ids,
+)
 
 
 class RecipeFilterSet(django_filters.FilterSet):
@@ -12,9 +16,14 @@ class RecipeFilterSet(django_filters.FilterSet):
     - author - рецепты автора с переданным id;
     - is_favorited - рецепты в избранном текущего пользователя;
     - is_in_shopping_cart - рецепты в списке покупок текущего пользователя;
-    - tags - рецепты с одним из указанных тегов.
+    - tags - рецепты с одним из указанных тегов;
+    - tags_mode - режим фильтрации по тегам: any (по умолчанию) - хотя бы
+    один из указанных тегов, all - все указанные теги.
     """
 
+    TAGS_MODE_ANY = 'any'
+    TAGS_MODE_ALL = 'all'
+
     author = django_filters.NumberFilter(
         field_name='author__id',
         lookup_expr='exact',
@@ -25,10 +34,16 @@ class RecipeFilterSet(django_filters.FilterSet):
     is_in_shopping_cart = django_filters.NumberFilter(
         method='filter_is_in_shopping_cart',
     )
-    tags = django_filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-        field_name='tags__slug',
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_slug_choices,
+        method='filter_tags',
+    )
+    tags_mode = django_filters.ChoiceFilter(
+        choices=(
+            (TAGS_MODE_ANY, TAGS_MODE_ANY),
+            (TAGS_MODE_ALL, TAGS_MODE_ALL),
+        ),
+        method='filter_tags_mode',
     )
 
     class Meta:
@@ -40,17 +55,46 @@ class RecipeFilterSet(django_filters.FilterSet):
         )
 
     def filter_is_favorited(self, queryset, name, value):
-        return self._filter_in_list(queryset, value, 'favorites_recipes')
+        return self._filter_in_list(queryset, value, favorite_recipe_ids)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        return self._filter_in_list(queryset, value, 'shopping_cart_recipes')
+        return self._filter_in_list(
+            queryset,
+            value,
+            shopping_cart_recipe_ids,
+        )
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Фильтрация по денормализованному индексу тегов рецепта.
+
+        Условие проверяет наличие ключей в поле tags_index, поэтому JOIN с
+        таблицами тегов и DISTINCT не нужны. Слаги сопоставляются с id по
+        реестру тегов без запроса к таблице тегов. Тег, удаленный после
+        проверки слагов, не найдется ни у одного рецепта.
+        """
+        tags = tag_registry.filter_by_slugs(set(value))
+        keys = [str(tag.pk) for tag in tags]
+        if self.form.cleaned_data.get('tags_mode') == self.TAGS_MODE_ALL:
+            if len(tags) < len(set(value)):
+                return queryset.none()
+            return queryset.filter(tags_index__has_keys=keys)
+        if not keys:
+            return queryset.none()
+        return queryset.filter(tags_index__has_any_keys=keys)
+
+    def filter_tags_mode(self, queryset, name, value):
+        """Режим учитывается в filter_tags."""
+        return queryset
 
-    def _filter_in_list(self, queryset, value, related_name):
+    def _filter_in_list(
+        self,
+        queryset,
+        value,
+        user_recipe_ids: UserRecipeIds,
+    ):
+        """Фильтрация по закешированному множеству id рецептов списка."""
         user = self.request.user
         if user.is_authenticated and value == 1:
-            return queryset.filter(
-                id__in=Subquery(
-                    getattr(user, related_name).values_list('id', flat=True),
-                ),
-            )
+            return queryset.filter(id__in=user_recipe_ids.get(user.id))
         return queryset
@@ -5,4 +5,4 @@ class IsAuthor(IsAuthenticated):
     """Доступ к объекту имеет только автор."""
 
     def has_object_permission(self, request, view, obj):
-        return obj.author == request.user
+        return obj.author_id == request.user.id
@@ -1,23 +1,168 @@
-from typing import Any, Union
+import uuid
+from typing import Any, Iterable, Optional, Union
 
-from drf_extra_fields.fields import Base64ImageField
-from drf_writable_nested import WritableNestedModelSerializer
+import filetype
+from drf_extra_fields.fields import Base64FileField, Base64ImageField
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Model
 from django.forms.models import model_to_dict
 from django.utils.translation import gettext_lazy as _
 
-from api.v1.users.serializers import MethodFieldUserSerializer
+from api.v1.fields import ImageVariantsField
+from api.v1.users.serializers import (
+    MethodFieldUserSerializer,
+    RecipeMinifiedSerializer,
+)
+from recipes.images import (
+    INPUT_FORMATS,
+    ImageTooLargeError,
+    check_image_header,
+    enqueue_image_processing,
+    reset_recipe_image,
+)
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.recipe_writes import save_recipe
+from recipes.user_recipe_ids import (
+    UserRecipeIds,
+    favorite_recipe_ids,
+    shopping_cart_recipe_ids,
+)
 
 
-class DictPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+USER_RECIPE_IDS_CONTEXT_KEY = 'user_recipe_ids:{list_name}'
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, объекты которых загружаются одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        self.child_relation.resolve(data)
+        objects: list[Model] = []
+        errors: list[str] = []
+        for item in data:
+            try:
+                objects.append(self.child_relation.run_validation(item))
+            except serializers.ValidationError as e:
+                errors.extend(e.detail)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return objects
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Первичный ключ с предварительной загрузкой объектов.
+
+    Перед валидацией списка значений метод resolve загружает все
+    указанные объекты одним запросом (pk__in), после чего каждое значение
+    проверяется без обращения к базе данных. Сообщения об ошибках
+    совпадают с сообщениями PrimaryKeyRelatedField.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._resolved_objects: Optional[dict[Any, Model]] = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def _to_pk(self, data):
+        """Приведение значения к типу первичного ключа модели."""
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, data: Iterable[Any]) -> None:
+        """Загрузка объектов для всех корректных значений одним запросом."""
+        pks = set()
+        for item in data:
+            try:
+                pks.add(self._to_pk(item))
+            except serializers.ValidationError:
+                continue
+        self._resolved_objects = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self._resolved_objects is None:
+            return super().to_internal_value(data)
+        try:
+            return self._resolved_objects[self._to_pk(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class DictPrimaryKeyRelatedField(BulkPrimaryKeyRelatedField):
     """Возвращает словарь объекта по первичному ключу."""
 
     def to_representation(self, value):
         return model_to_dict(value)
 
 
+class RecipeImageField(Base64FileField):
+    """
+    Изображение рецепта: строка base64 или файл из multipart-запроса.
+
+    Файл проверяется только по заголовку (формат и число пикселей, см.
+    recipes.images.check_image_header), а декодирование и перекодирование
+    выполняются фоновой обработкой, поэтому запрос не занят обработкой
+    изображения. Файлы multipart-запроса не декодируются из base64 и не
+    учитываются в DATA_UPLOAD_MAX_MEMORY_SIZE, а записываются во
+    временный файл по мере получения (FILE_UPLOAD_HANDLERS).
+    """
+
+    ALLOWED_TYPES = Base64ImageField.ALLOWED_TYPES
+    INVALID_FILE_MESSAGE = Base64ImageField.INVALID_FILE_MESSAGE
+    INVALID_TYPE_MESSAGE = Base64ImageField.INVALID_TYPE_MESSAGE
+    TOO_LARGE_MESSAGE = _(
+        'Изображение не должно содержать больше {max_pixels} пикселей.',
+    )
+
+    def get_file_extension(self, filename, decoded_file):
+        extension = filetype.guess_extension(decoded_file)
+        if extension is None:
+            raise DjangoValidationError(self.INVALID_FILE_MESSAGE)
+        return 'jpg' if extension == 'jpeg' else extension
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or data in self.EMPTY_VALUES:
+            image_file = super().to_internal_value(data)
+        else:
+            image_file = serializers.FileField.to_internal_value(self, data)
+        if image_file is None:
+            return image_file
+        try:
+            image_format, _size = check_image_header(image_file)
+        except ImageTooLargeError:
+            raise serializers.ValidationError(
+                self.TOO_LARGE_MESSAGE.format(
+                    max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS,
+                ),
+            )
+        except (OSError, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        image_file.name = f'{uuid.uuid4()}.{INPUT_FORMATS[image_format]}'
+        return image_file
+
+
 class TagSeralizer(serializers.ModelSerializer):
     """Сериализатор для отображения тегов."""
 
@@ -44,10 +189,23 @@ class IngredientSeralizer(serializers.ModelSerializer):
         read_only_fields = ('name', 'measurement_unit')
 
 
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта, загружаемых одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields['id'].resolve(
+                item['id']
+                for item in data
+                if isinstance(item, dict) and item.get('id') is not None
+            )
+        return super().to_internal_value(data)
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиента в рецепте."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects,
         many=False,
         source='ingredient',
@@ -56,6 +214,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = RecipeIngredientListSerializer
 
     def to_representation(self, instance):
         representation: dict[str, Any] = {}
@@ -66,16 +225,20 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         return representation
 
 
-class RecipeSerializer(WritableNestedModelSerializer):
-    """Сериализатор для отображения рецепта."""
+class RecipeSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для отображения рецепта.
+
+    Рецепт с ингредиентами и тегами сохраняется через
+    recipes.recipe_writes.save_recipe: связи изменяются по разнице со
+    старым набором массовыми операциями.
+    """
 
     author = MethodFieldUserSerializer(many=False, read_only=True)
-    image = Base64ImageField(required=True, allow_null=False)
-    is_favorited = serializers.BooleanField(read_only=True, default=False)
-    is_in_shopping_cart = serializers.BooleanField(
-        read_only=True,
-        default=False,
-    )
+    image = RecipeImageField(required=True, allow_null=False)
+    image_variants = ImageVariantsField()
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
     tags = DictPrimaryKeyRelatedField(many=True, queryset=Tag.objects)
     ingredients = RecipeIngredientSerializer(
         many=True,
@@ -93,6 +256,9 @@ class RecipeSerializer(WritableNestedModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_status',
+            'image_variants',
+            'image_placeholder',
             'text',
             'cooking_time',
         )
@@ -100,8 +266,86 @@ class RecipeSerializer(WritableNestedModelSerializer):
             'id',
             'is_favorited',
             'is_in_shopping_cart',
+            'image_status',
+            'image_placeholder',
         )
 
+    def create(self, validated_data: dict[str, Any]) -> Recipe:
+        return self._save(Recipe(), validated_data)
+
+    def update(
+        self,
+        instance: Recipe,
+        validated_data: dict[str, Any],
+    ) -> Recipe:
+        return self._save(instance, validated_data)
+
+    @transaction.atomic
+    def _save(self, recipe: Recipe, validated_data: dict[str, Any]) -> Recipe:
+        """
+        Сохранение рецепта вместе с ингредиентами и тегами.
+
+        Новое изображение сохраняется как есть и ставится в очередь
+        фоновой обработки; до ее завершения image_status - processing.
+        Файлы прежнего изображения освобождаются после фиксации
+        транзакции.
+        """
+        image_changed = 'image' in validated_data
+        if image_changed:
+            reset_recipe_image(
+                recipe,
+                previous=(
+                    None
+                    if recipe.pk is None
+                    else (recipe.image.name, recipe.image_variants)
+                ),
+            )
+        recipe_ingredients = validated_data.pop('recipe_ingredients', None)
+        tags = validated_data.pop('tags', None)
+        for attr, value in validated_data.items():
+            setattr(recipe, attr, value)
+        amounts = None
+        if recipe_ingredients is not None:
+            amounts = {
+                item['ingredient'].pk: item['amount']
+                for item in recipe_ingredients
+            }
+        save_recipe(
+            recipe,
+            amounts=amounts,
+            tag_ids=None if tags is None else [tag.pk for tag in tags],
+        )
+        if image_changed:
+            enqueue_image_processing(recipe)
+        return recipe
+
+    def get_is_favorited(self, obj: Recipe) -> bool:
+        return self._is_in_user_list(obj, favorite_recipe_ids)
+
+    def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
+        return self._is_in_user_list(obj, shopping_cart_recipe_ids)
+
+    def _is_in_user_list(
+        self,
+        obj: Recipe,
+        user_recipe_ids: UserRecipeIds,
+    ) -> bool:
+        """
+        Проверка нахождения рецепта в списке текущего пользователя.
+
+        Множество id рецептов списка берется из кеша один раз на ответ и
+        сохраняется в контексте сериализатора.
+        """
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return False
+        key = USER_RECIPE_IDS_CONTEXT_KEY.format(
+            list_name=user_recipe_ids.list_name,
+        )
+        if key not in self.context:
+            self.context[key] = user_recipe_ids.get(request.user.id)
+        return obj.pk in self.context[key]
+
     def _many_to_many_field_validate(
         self,
         data: list[Union[Ingredient, Tag]],
@@ -135,3 +379,13 @@ class RecipeSerializer(WritableNestedModelSerializer):
         message = _('Тег "%(name)s" уже выбран. Пожалуйста, выберите другой.')
         self._many_to_many_field_validate(data=data, message=message)
         return data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список рецептов для пакетного добавления в список или удаления."""
+
+    recipes = BulkPrimaryKeyRelatedField(
+        many=True,
+        allow_empty=False,
+        queryset=Recipe.objects.only(*RecipeMinifiedSerializer.Meta.fields),
+    )
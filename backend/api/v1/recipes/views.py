@@ -1,6 +1,7 @@
 import csv
 import datetime
-from typing import Any, ClassVar
+import itertools
+from typing import Any, ClassVar, Iterator, Optional
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, serializers, status, viewsets
@@ -8,19 +9,68 @@ from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from django.db.models import Exists, Model, OuterRef, QuerySet, Sum
-from django.http import HttpResponse
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Prefetch, QuerySet
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
 from django.utils.translation import gettext_lazy as _
 
+from api.v1.pagination import CachedCountCursorPagination, FeedPagination
+from api.v1.signals import RECIPES_COUNT_SCOPE
 from api.v1.users.serializers import RecipeMinifiedSerializer
-from recipes.models import FavoritesList, Ingredient, Recipe, ShoppingCart, Tag
+from api.v1.views import AsyncReadViewSetMixin, MultiSeralizerViewSetMixin
+from recipes.ingredient_index import (
+    CatalogBody,
+    ingredient_catalog,
+    ingredient_index,
+)
+from recipes.models import (
+    FavoritesList,
+    Ingredient,
+    ListModel,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from recipes.tag_registry import tag_registry
+from recipes.user_lists import add_to_list, remove_from_list
+from recipes.user_recipe_ids import (
+    favorite_recipe_ids,
+    shopping_cart_recipe_ids,
+)
+from users.models import Follow
 
 from .filters import RecipeFilterSet
 from .permissions import IsAuthor
-from .serializers import IngredientSeralizer, RecipeSerializer, TagSeralizer
+from .serializers import (
+    USER_RECIPE_IDS_CONTEXT_KEY,
+    IngredientSeralizer,
+    RecipeIdsSerializer,
+    RecipeSerializer,
+    TagSeralizer,
+)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+User = get_user_model()
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class TagViewSet(AsyncReadViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для отображения тегов."""
 
     queryset = Tag.objects.all()
@@ -28,8 +78,38 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     permission_classes = [permissions.AllowAny]
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов из реестра в памяти процесса."""
+        serializer = self.get_serializer(tag_registry.all(), many=True)
+        return Response(serializer.data)
+
+    async def alist(self, request, *args, **kwargs):
+        serializer = self.get_serializer(await tag_registry.aall(), many=True)
+        return Response(serializer.data)
+
+    def get_object(self):
+        """Тег из реестра в памяти процесса."""
+        return self._check_tag(tag_registry.get(self._get_tag_id()))
+
+    async def aget_object(self):
+        return self._check_tag(await tag_registry.aget(self._get_tag_id()))
+
+    def _get_tag_id(self) -> Optional[int]:
+        """Id тега из URL или None, если это не число."""
+        try:
+            return int(self.kwargs[self.lookup_field])
+        except ValueError:
+            return None
+
+    def _check_tag(self, tag: Optional[Tag]) -> Tag:
+        """Проверка найденного тега и прав доступа к нему."""
+        if tag is None:
+            raise Http404
+        self.check_object_permissions(self.request, tag)
+        return tag
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(AsyncReadViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для отображения ингредиентов."""
 
     queryset = Ingredient.objects.all()
@@ -47,27 +127,93 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
         """
         if self.request.query_params and 'name' in self.request.query_params:
             search_value = self.request.query_params['name']
-            return Ingredient.objects.filter(
-                name__icontains=search_value,
+            return Ingredient.objects.search_name(
+                search_value,
             ).order_by_is_startswith_value(
                 search_value,
             )
         return super().get_queryset()
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список ингредиентов.
+
+        Поиск по параметру name выполняется по индексу в памяти процесса
+        (recipes.ingredient_index) с тем же порядком, что и в get_queryset.
+        """
+        if 'name' in request.query_params:
+            return Response(
+                ingredient_index.search(request.query_params['name']),
+            )
+        return self._catalog_response(request, ingredient_catalog.get())
+
+    async def alist(self, request, *args, **kwargs):
+        if 'name' in request.query_params:
+            return Response(
+                await ingredient_index.asearch(request.query_params['name']),
+            )
+        return self._catalog_response(request, await ingredient_catalog.aget())
+
+    def _catalog_response(
+        self,
+        request: Request,
+        catalog: CatalogBody,
+    ) -> HttpResponse:
+        """
+        Полный каталог ингредиентов из заранее сжатого тела.
+
+        Тело строится один раз для каждой версии данных
+        (recipes.ingredient_index.ingredient_catalog). ETag зависит от
+        выбранной кодировки; если он совпадает с If-None-Match,
+        возвращается ответ 304 без тела.
+        """
+        encodings = {
+            encoding.split(';')[0].strip()
+            for encoding in request.META.get(
+                'HTTP_ACCEPT_ENCODING',
+                '',
+            ).split(',')
+        }
+        body, content_encoding = catalog.identity, None
+        if 'br' in encodings:
+            body, content_encoding = catalog.br, 'br'
+        elif 'gzip' in encodings:
+            body, content_encoding = catalog.gzip, 'gzip'
+        etag = catalog.get_etag(content_encoding)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in parse_etags(if_none_match):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+            if content_encoding:
+                response['Content-Encoding'] = content_encoding
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    AsyncReadViewSetMixin,
+    MultiSeralizerViewSetMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для отображения рецептов."""
 
     ACTIONS_AUTHENTICATED: ClassVar[tuple[str]] = (
         'create',
         'favorite',
         'shopping_cart',
+        'favorite_batch',
+        'shopping_cart_batch',
         'download_shopping_cart',
+        'feed',
     )
     ACTIONS_AUTHOR: ClassVar[tuple[str]] = (
         'partial_update',
         'destroy',
     )
+    SHOPPING_CART_CHUNK_SIZE: ClassVar[int] = 500
 
     http_method_names = (
         'get',
@@ -80,36 +226,53 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilterSet
+    pagination_class = CachedCountCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
+    count_cache_scope = RECIPES_COUNT_SCOPE
+    count_cache_user_params = ('is_favorited', 'is_in_shopping_cart')
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeSerializer
+    serializer_classes = {
+        'favorite': RecipeMinifiedSerializer,
+        'shopping_cart': RecipeMinifiedSerializer,
+        'favorite_batch': RecipeIdsSerializer,
+        'shopping_cart_batch': RecipeIdsSerializer,
+    }
+    action_fields = {
+        'favorite': RecipeMinifiedSerializer.Meta.fields,
+        'shopping_cart': RecipeMinifiedSerializer.Meta.fields,
+        'partial_update': (),
+        'destroy': ('id', 'author', 'image', 'image_variants'),
+    }
 
-    def get_queryset(self):
+    def get_read_queryset(self):
         if self.action == 'download_shopping_cart':
-            return self.request.user.shopping_cart_recipes.prefetch_related(
-                'recipe_ingredients',
-            ).values(
-                'recipe_ingredients__ingredient',
-            ).annotate(
-                amount=Sum('recipe_ingredients__amount'),
-            ).values(
-                'recipe_ingredients__ingredient__name',
+            return self.request.user.shopping_list_items.values(
+                'ingredient__name',
                 'amount',
-                'recipe_ingredients__ingredient__measurement_unit',
+                'ingredient__measurement_unit',
             ).order_by(
-                'recipe_ingredients__ingredient__name',
+                'ingredient__name',
             )
-        return Recipe.objects.select_related(
-            'author',
-        ).prefetch_related(
-            'ingredients',
+        return Recipe.objects.prefetch_related(
+            self._prefetch_author(),
+            self._prefetch_recipe_ingredients(),
             'tags',
-        ).annotate(
-            is_favorited=self._is_in_user_list(FavoritesList),
-            is_in_shopping_cart=self._is_in_user_list(ShoppingCart),
         )
 
-    def get_serializer_class(self):
-        if self.action in ['shopping_cart', 'favorite']:
-            return RecipeMinifiedSerializer
-        return RecipeSerializer
+    async def aget_serializer_context(self) -> dict[str, Any]:
+        """Контекст с заранее загруженными списками пользователя."""
+        context = self.get_serializer_context()
+        if self.request.user.is_authenticated:
+            for user_recipe_ids in (
+                favorite_recipe_ids,
+                shopping_cart_recipe_ids,
+            ):
+                key = USER_RECIPE_IDS_CONTEXT_KEY.format(
+                    list_name=user_recipe_ids.list_name,
+                )
+                context[key] = await user_recipe_ids.aget(self.request.user.id)
+        return context
 
     def get_permissions(self):
         if self.action in self.ACTIONS_AUTHENTICATED:
@@ -120,37 +283,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        self._refresh_instance(serializer)
 
     def perform_update(self, serializer):
-        self.get_object().recipe_ingredients.all().delete()
-        return super().perform_update(serializer)
-
-    def _is_in_user_list(self, model: Model) -> Exists:
-        """Возвращает статус нахождения объекта в списке."""
-        return Exists(
-            model.objects.filter(
-                user__id=self.request.user.id,
-                recipe=OuterRef('id'),
+        super().perform_update(serializer)
+        self._refresh_instance(serializer)
+
+    def _refresh_instance(self, serializer: serializers.Serializer) -> None:
+        """
+        Повторная загрузка сохраненного рецепта.
+
+        Ответ на создание/ изменение рецепта строится по объекту с тем же
+        набором prefetch и аннотаций, что и при чтении, поэтому число
+        запросов не зависит от количества ингредиентов и тегов.
+        """
+        serializer.instance = self.get_read_queryset().get(
+            pk=serializer.instance.pk,
+        )
+
+    def _prefetch_author(self) -> Prefetch:
+        """
+        Загрузка авторов со статусом подписки.
+
+        Статус подписки текущего пользователя вычисляется одним запросом
+        для всех авторов рецептов на странице.
+        """
+        return Prefetch(
+            'author',
+            queryset=User.objects.annotate(
+                is_subscribed=Exists(
+                    Follow.objects.filter(
+                        follower__id=self.request.user.id,
+                        following=OuterRef('pk'),
+                    ),
+                ),
             ),
         )
 
+    def _prefetch_recipe_ingredients(self) -> Prefetch:
+        """Загрузка ингредиентов рецепта вместе с промежуточной таблицей."""
+        return Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient'),
+        )
+
+    def _get_recipe_id(self) -> int:
+        """Id рецепта из URL без загрузки рецепта."""
+        try:
+            return int(self.kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+
+    def _get_list_recipe(self) -> Recipe:
+        """Рецепт с полями для сокращенного отображения."""
+        recipe = get_object_or_404(
+            self.get_queryset(),
+            pk=self._get_recipe_id(),
+        )
+        self.check_object_permissions(self.request, recipe)
+        return recipe
+
     def _add_to_list(
         self,
-        related_name: str,
+        model: type[ListModel],
         error_message: str,
     ) -> Response:
-        """Добавить рецепт в список."""
-        user = self.request.user
-        recipe = self.get_object()
-        is_exists = getattr(user, related_name).filter(recipe=recipe).exists()
-        if is_exists:
+        """
+        Добавить рецепт в список.
+
+        Запись создается одним INSERT; повторное добавление (в том числе
+        при одновременных запросах) определяется по ограничению
+        уникальности и возвращает ошибку 400.
+        """
+        recipe = self._get_list_recipe()
+        try:
+            add_to_list(model, self.request.user.id, [recipe.pk])
+        except IntegrityError:
             raise serializers.ValidationError(
                 {
                     'recipe_id': error_message,
                 },
                 code='already_exist',
             )
-        getattr(user, related_name).create(user=user, recipe=recipe)
         serializer_class = self.get_serializer_class()(recipe, many=False)
         return Response(
             serializer_class.data,
@@ -159,69 +373,91 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def _delete_from_list(
         self,
-        related_name: str,
+        model: type[ListModel],
         error_message: str,
     ) -> Response:
         """Удалить рецепт из списка."""
-        user = self.request.user
-        recipe = self.get_object()
-        is_exists = getattr(user, related_name).filter(recipe=recipe).exists()
-        if not is_exists:
+        recipe_id = self._get_recipe_id()
+        if not remove_from_list(model, self.request.user.id, [recipe_id]):
+            get_object_or_404(Recipe.objects.only('id'), pk=recipe_id)
             raise serializers.ValidationError(
                 {
                     'recipe_id': error_message,
                 },
                 code='not_exist',
             )
-        getattr(user, related_name).filter(recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def _add_to_list_delete_from_list(
         self,
         request: Request,
-        related_name: str,
+        model: type[ListModel],
         error_message_add: str,
         error_message_delete: str,
     ):
         """Добавить рецепт в список/ удалить рецепт из списка."""
         if request.method == 'POST':
             return self._add_to_list(
-                related_name=related_name,
+                model=model,
                 error_message=error_message_add,
             )
         if request.method == 'DELETE':
             return self._delete_from_list(
-                related_name=related_name,
+                model=model,
                 error_message=error_message_delete,
             )
 
-    def _shopping_cart_qs_to_dataset(
+    def _batch_add_to_list_delete_from_list(
+        self,
+        request: Request,
+        model: type[ListModel],
+    ) -> Response:
+        """
+        Добавить рецепты в список/ удалить рецепты из списка.
+
+        Рецепты проверяются одним запросом, добавление выполняется одним
+        INSERT с пропуском уже добавленных, удаление - одним DELETE.
+        Повторные запросы не приводят к ошибке.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+        recipe_ids = [recipe.pk for recipe in recipes]
+        if request.method == 'DELETE':
+            remove_from_list(model, request.user.id, recipe_ids)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        add_to_list(model, request.user.id, recipe_ids, ignore_conflicts=True)
+        return Response(
+            RecipeMinifiedSerializer(recipes, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    def _shopping_cart_rows(
         self,
         queryset: QuerySet,
-    ) -> list[dict[str, Any]]:
-        """Преобразовать набор ингредиентов в список словарей."""
-        return [
-            {
-                '№': elem[0],
-                'Наименование': elem[1].get(
-                    'recipe_ingredients__ingredient__name',
-                ),
-                'Количество': elem[1].get(
-                    'amount',
-                ),
-                'Единицы измерения': elem[1].get(
-                    'recipe_ingredients__ingredient__measurement_unit',
-                ),
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Построчное преобразование набора ингредиентов в словари.
+
+        Набор читается частями через iterator (на PostgreSQL - серверным
+        курсором), поэтому в памяти одновременно находится не больше
+        SHOPPING_CART_CHUNK_SIZE строк.
+        """
+        rows = queryset.iterator(chunk_size=self.SHOPPING_CART_CHUNK_SIZE)
+        for number, row in enumerate(rows, 1):
+            yield {
+                '№': number,
+                'Наименование': row.get('ingredient__name'),
+                'Количество': row.get('amount'),
+                'Единицы измерения': row.get('ingredient__measurement_unit'),
             }
-            for elem in enumerate(queryset, 1)
-        ]
 
     @action(methods=['post', 'delete'], detail=True)
     def favorite(self, request, *args, **kwargs):
         """Добавить рецепт в избранное/ удалить из избранного."""
         return self._add_to_list_delete_from_list(
             request=request,
-            related_name='favoriteslist_related',
+            model=FavoritesList,
             error_message_add=_('Рецепт уже в избранном'),
             error_message_delete=_('Рецепта нет в избранном.'),
         )
@@ -231,19 +467,60 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Добавить рецепт в список покупок/ удалить из списка покупок."""
         return self._add_to_list_delete_from_list(
             request=request,
-            related_name='shoppingcart_related',
+            model=ShoppingCart,
             error_message_add=_('Рецепт уже в списке покупок.'),
             error_message_delete=_('Рецепта нет в списке покупок.'),
         )
 
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-batch',
+    )
+    def favorite_batch(self, request, *args, **kwargs):
+        """Добавить рецепты в избранное/ удалить из избранного."""
+        return self._batch_add_to_list_delete_from_list(
+            request=request,
+            model=FavoritesList,
+        )
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+    )
+    def shopping_cart_batch(self, request, *args, **kwargs):
+        """Добавить рецепты в список покупок/ удалить из списка покупок."""
+        return self._batch_add_to_list_delete_from_list(
+            request=request,
+            model=ShoppingCart,
+        )
+
+    @action(methods=['get'], detail=False)
+    def feed(self, request, *args, **kwargs):
+        """
+        Лента рецептов авторов из подписок, начиная с новых.
+
+        Страница id рецептов читается из ленты пользователя
+        (recipes.feed), рецепты загружаются одним запросом с тем же
+        набором prefetch, что и список рецептов.
+        """
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_feed(request, request.user.id)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(methods=['get'], detail=False)
     def download_shopping_cart(self, request, *args, **kwargs):
         """Скачать ингредиенты для рецептов из списка покупок."""
-        qs = self.get_queryset()
-        data = self._shopping_cart_qs_to_dataset(qs)
-        response = HttpResponse(content_type='text/csv')
         writer = csv.DictWriter(
-            response,
+            Echo(),
             fieldnames=[
                 '№',
                 'Наименование',
@@ -251,8 +528,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 'Единицы измерения',
             ],
         )
-        writer.writeheader()
-        writer.writerows(data)
+        rows = self._shopping_cart_rows(self.get_queryset())
+        response = StreamingHttpResponse(
+            itertools.chain(
+                [writer.writeheader()],
+                (writer.writerow(row) for row in rows),
+            ),
+            content_type='text/csv',
+        )
         current_date = datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S')
         filename = f'shopping_cart_{current_date}.csv'
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
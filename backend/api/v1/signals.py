@@ -0,0 +1,69 @@
+from rest_framework.authtoken.models import Token
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import FavoritesList, Recipe, RecipeTag, ShoppingCart
+from recipes.user_lists import recipes_added_to_list, recipes_removed_from_list
+
+from .authentication import token_users
+from .pagination import invalidate_count_cache
+
+
+User = get_user_model()
+
+
+RECIPES_COUNT_SCOPE = 'recipes'
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+@receiver(post_save, sender=FavoritesList)
+@receiver(post_delete, sender=FavoritesList)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(recipes_added_to_list)
+@receiver(recipes_removed_from_list)
+def invalidate_recipes_count(sender, **kwargs):
+    """Сброс закешированного количества рецептов при изменении данных."""
+    transaction.on_commit(lambda: invalidate_count_cache(RECIPES_COUNT_SCOPE))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes_count_on_tags_change(sender, action, **kwargs):
+    """Сброс закешированного количества рецептов при смене тегов."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(
+            lambda: invalidate_count_cache(RECIPES_COUNT_SCOPE),
+        )
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_user(sender, instance, **kwargs):
+    """Сброс закешированного пользователя при удалении токена (выход)."""
+    if not settings.AUTH_TOKEN_CACHE_ENABLED:
+        return
+    # Ключ - первичный ключ токена: после удаления он обнуляется.
+    token_key = instance.key
+    transaction.on_commit(lambda: token_users.invalidate([token_key]))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields, **kwargs):
+    """
+    Сброс закешированных токенов пользователя при его изменении.
+
+    Смена пароля, деактивация и другие изменения требуют повторной
+    проверки токена по базе данных. Обновление только времени входа кеш
+    не сбрасывает.
+    """
+    if not settings.AUTH_TOKEN_CACHE_ENABLED:
+        return
+    if created or update_fields == frozenset(['last_login']):
+        return
+    transaction.on_commit(lambda: token_users.invalidate_user(instance.pk))
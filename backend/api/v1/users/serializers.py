@@ -5,6 +5,7 @@ from rest_framework import serializers
 
 from django.contrib.auth import get_user_model
 
+from api.v1.fields import ImageVariantsField
 from api.v1.utils import is_in_user_list
 from recipes.models import Recipe
 
@@ -62,8 +63,11 @@ class MethodFieldUserSerializer(UserSerializer):
         Проверка статуса подписки.
 
         Возвращает True, если текущий пользователь подписан на автора,
-        данные которого представлены в obj.
+        данные которого представлены в obj. Если статус уже вычислен
+        аннотацией (is_subscribed), дополнительный запрос не выполняется.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return is_in_user_list(
             serializer=self,
             obj=obj,
@@ -76,10 +80,18 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Сокращенное отображение рецепта."""
 
     image = serializers.URLField(source='image.url')
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id',
+            'name',
+            'image',
+            'image_variants',
+            'image_placeholder',
+            'cooking_time',
+        )
 
 
 class UserSubscribeSerializer(UserSerializer):
@@ -89,7 +101,6 @@ class UserSubscribeSerializer(UserSerializer):
         many=True,
         read_only=True,
     )
-    recipes_count = serializers.IntegerField()
     is_subscribed = serializers.BooleanField(read_only=True, default=True)
 
     class Meta(UserSerializer.Meta):
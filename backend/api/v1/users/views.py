@@ -14,15 +14,19 @@ from rest_framework.mixins import (
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.utils.translation import gettext_lazy as _
 
+from api.v1.pagination import PageLimitCursorPagination
 from api.v1.views import MultiSeralizerViewSetMixin
 from recipes.models import Recipe
 from users.models import Follow
 
 from .serializers import (
+    RecipeMinifiedSerializer,
     UserCreateSerializer,
     UserSerializer,
     UserSubscribeSerializer,
@@ -60,10 +64,16 @@ class UserViewSet(MultiSeralizerViewSetMixin, CreateRetrieveListViewSet):
         'retrieve',
         'me',
         'set_password',
-        'subscriptions'
+        'subscriptions',
+        'subscribe',
+    )
+    ACTIONS_WITH_RECIPES: ClassVar[tuple[str]] = (
+        'subscriptions',
         'subscribe',
     )
 
+    pagination_class = PageLimitCursorPagination
+    cursor_ordering = ('pk',)
     serializer_class = UserSerializer
     serializer_classes = {
         'create': UserCreateSerializer,
@@ -71,22 +81,53 @@ class UserViewSet(MultiSeralizerViewSetMixin, CreateRetrieveListViewSet):
         'subscriptions': UserSubscribeSerializer,
         'subscribe': UserSubscribeSerializer,
     }
+    queryset = User.objects.all()
+    action_fields = {
+        'subscribe': ('id',),
+    }
 
-    def _prefetch_recipes(self) -> Subquery:
-        """Подзапрос для извлечения только указанного числа рецептов."""
-        recipes_limit = self.request.query_params.get('recipes_limit')
-        recipes_limit = int(recipes_limit) if recipes_limit else recipes_limit
-        subquery = Subquery(
-            Recipe.objects.filter(
-                author__id=OuterRef('author__id'),
-            ).values_list(
-                'id',
-                flat=True,
-            )[:recipes_limit],
-        )
+    def _get_recipes_limit(self) -> int:
+        """
+        Число рецептов автора в подписке.
+
+        Берется из параметра recipes_limit и ограничивается
+        SUBSCRIPTION_RECIPES_LIMIT; без параметра или при некорректном
+        значении используется SUBSCRIPTION_RECIPES_LIMIT.
+        """
+        max_limit = settings.SUBSCRIPTION_RECIPES_LIMIT
+        try:
+            recipes_limit = int(self.request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return max_limit
+        return min(max(recipes_limit, 0), max_limit)
+
+    def _prefetch_recipes(self) -> Prefetch:
+        """
+        Последние рецепты каждого автора страницы.
+
+        Рецепты нумеруются внутри автора оконной функцией
+        ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY pub_date DESC),
+        поэтому для всей страницы выполняется один запрос, возвращающий
+        не больше recipes_limit рецептов на автора.
+        """
         return Prefetch(
             'recipes',
-            queryset=Recipe.objects.filter(id__in=subquery),
+            queryset=Recipe.objects.only(
+                *RecipeMinifiedSerializer.Meta.fields,
+                'author_id',
+                'pub_date',
+            ).annotate(
+                author_row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('pk').desc()),
+                ),
+            ).filter(
+                author_row_number__lte=self._get_recipes_limit(),
+            ).order_by(
+                '-pub_date',
+                '-pk',
+            ),
         )
 
     def _is_subscription_exists(self) -> Exists:
@@ -98,16 +139,14 @@ class UserViewSet(MultiSeralizerViewSetMixin, CreateRetrieveListViewSet):
             ),
         )
 
-    def get_queryset(self):
-        qs = User.objects.prefetch_related(
-            'following',
-            self._prefetch_recipes(),
-        ).annotate(
+    def get_read_queryset(self):
+        qs = User.objects.annotate(
             is_subscribed=self._is_subscription_exists(),
-            recipes_count=Count('recipes'),
         ).order_by(
             'pk',
         )
+        if self.action in self.ACTIONS_WITH_RECIPES:
+            qs = qs.prefetch_related(self._prefetch_recipes())
         if self.action == 'subscriptions':
             return qs.filter(following__follower=self.request.user)
         return qs
@@ -118,7 +157,7 @@ class UserViewSet(MultiSeralizerViewSetMixin, CreateRetrieveListViewSet):
         return [permissions.AllowAny()]
 
     def get_instance(self) -> User:
-        return self.get_queryset().get(pk=self.request.user.pk)
+        return self.get_read_queryset().get(pk=self.request.user.pk)
 
     @action(methods=['get'], detail=False)
     def me(self, request, *args, **kwargs):
@@ -153,7 +192,7 @@ class UserViewSet(MultiSeralizerViewSetMixin, CreateRetrieveListViewSet):
             )
         user.subscriptions.add(author)
         serializer_class = self.get_serializer_class()(
-            self.get_object(),
+            self.get_read_queryset().get(pk=author.pk),
             many=False,
         )
         data = serializer_class.data
@@ -1,15 +1,156 @@
-from typing import Optional, Type
+from typing import Any, ClassVar, Optional, Type
 
+from asgiref.sync import sync_to_async
+from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model, QuerySet
+from django.http import Http404
+
 
 class MultiSeralizerViewSetMixin:
-    """Миксин для выбора сериализатора в зависимости от действия."""
+    """
+    Миксин для выбора сериализатора и набора объектов в зависимости от действия.
+
+    serializer_classes - сериализаторы по действию. action_fields - поля,
+    которые загружают действия, не использующие полное представление
+    объекта (изменение списков, удаление, проверки существования): для них
+    get_queryset возвращает queryset модели с only(*поля) без prefetch и
+    аннотаций; пустой кортеж загружает все поля модели. Остальные действия
+    используют get_read_queryset.
+    """
 
     serializer_classes: Optional[dict[str, Type[Serializer]]] = None
+    action_fields: Optional[dict[str, tuple[str, ...]]] = None
 
     def get_serializer_class(self):
         try:
             return self.serializer_classes[self.action]
         except KeyError:
             return super().get_serializer_class()
+
+    def get_queryset(self) -> QuerySet:
+        try:
+            fields = self.action_fields[self.action]
+        except (KeyError, TypeError):
+            return self.get_read_queryset()
+        queryset = super().get_queryset()
+        return queryset.only(*fields) if fields else queryset
+
+    def get_read_queryset(self) -> QuerySet:
+        """Набор объектов для отображения."""
+        return super().get_queryset()
+
+
+class AsyncReadViewSetMixin:
+    """
+    Асинхронные list и retrieve для работы под ASGI.
+
+    При ASYNC_READ_VIEWS as_view возвращает асинхронное представление:
+    действия из ASYNC_ACTIONS выполняются методами alist/aretrieve с
+    асинхронным ORM Django, остальные - обычным представлением DRF в
+    потоке (sync_to_async). Аутентификация, проверка прав, фильтрация и
+    пагинация DRF синхронны и тоже выполняются в потоке, поэтому ответы
+    совпадают с синхронными представлениями.
+    """
+
+    ASYNC_ACTIONS: ClassVar[dict[str, str]] = {
+        'list': 'alist',
+        'retrieve': 'aretrieve',
+    }
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_READ_VIEWS or not any(
+            action in cls.ASYNC_ACTIONS for action in actions.values()
+        ):
+            return view
+        return cls._as_async_view(view, actions, initkwargs)
+
+    @classmethod
+    def _as_async_view(cls, sync_view, actions, initkwargs):
+        actions = dict(actions)
+        if 'get' in actions and 'head' not in actions:
+            actions['head'] = actions['get']
+
+        async def view(request, *args, **kwargs):
+            action = actions.get(request.method.lower())
+            if action not in cls.ASYNC_ACTIONS:
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            self.args = args
+            self.kwargs = kwargs
+            request = self.initialize_request(request, *args, **kwargs)
+            self.request = request
+            self.headers = self.default_response_headers
+            try:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                handler = getattr(self, cls.ASYNC_ACTIONS[action])
+                response = await handler(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+            self.response = self.finalize_response(
+                request,
+                response,
+                *args,
+                **kwargs,
+            )
+            return self.response
+
+        view.cls = sync_view.cls
+        view.initkwargs = sync_view.initkwargs
+        view.actions = sync_view.actions
+        view.csrf_exempt = True
+        return view
+
+    async def afilter_queryset(self, queryset: QuerySet) -> QuerySet:
+        """Фильтрация в потоке: фильтры могут обращаться к базе данных."""
+        if not self.filter_backends:
+            return queryset
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def aget_serializer_context(self) -> dict[str, Any]:
+        """Контекст сериализатора; данные из базы загружаются заранее."""
+        return self.get_serializer_context()
+
+    async def aget_object(self) -> Model:
+        """Асинхронный вариант get_object."""
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            DjangoValidationError,
+        ):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        context = await self.aget_serializer_context()
+        serializer_class = self.get_serializer_class()
+        if page is not None:
+            serializer = serializer_class(page, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        objects = [obj async for obj in queryset]
+        serializer = serializer_class(objects, many=True, context=context)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer_class()(
+            instance,
+            context=await self.aget_serializer_context(),
+        )
+        return Response(serializer.data)
@@ -115,6 +115,80 @@ STATIC_ROOT = BASE_DIR / 'backend_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Stream uploaded files to temporary files instead of keeping them in memory
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Recipe images
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE', default=1600))
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', default=85))
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=40_000_000),
+)
+RECIPE_IMAGE_VARIANTS = {
+    'small': 320,
+    'medium': 640,
+}
+RECIPE_IMAGE_PLACEHOLDER_SIZE = 16
+IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv('IMAGE_JOB_MAX_ATTEMPTS', default=3))
+IMAGE_JOB_RETRY_DELAY = int(os.getenv('IMAGE_JOB_RETRY_DELAY', default=60))
+
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'DJANGO_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', default=''),
+    },
+    'user_recipe_ids': {
+        'BACKEND': os.getenv(
+            'DJANGO_USER_RECIPE_IDS_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv(
+            'DJANGO_USER_RECIPE_IDS_CACHE_LOCATION',
+            default='user_recipe_ids',
+        ),
+    },
+}
+
+# Cache backends shared by all worker processes. Caches that must see
+# invalidations made by other processes are enabled only on these backends
+SHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+USER_RECIPE_IDS_CACHE = 'user_recipe_ids'
+# Favorite and shopping cart recipe ids are cached only in a shared cache
+USER_RECIPE_IDS_CACHE_ENABLED = (
+    CACHES[USER_RECIPE_IDS_CACHE]['BACKEND'] in SHARED_CACHE_BACKENDS
+)
+USER_RECIPE_IDS_CACHE_TIMEOUT = int(
+    os.getenv('USER_RECIPE_IDS_CACHE_TIMEOUT', default=300),
+)
+
+# Token to user id cache for API authentication; a revoked token must stop
+# working in every worker, so it is used only with a shared cache
+AUTH_TOKEN_CACHE_ENABLED = CACHES['default']['BACKEND'] in SHARED_CACHE_BACKENDS
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=300),
+)
+
+
+# Process data (tag registry, ingredient index and catalog) is rebuilt
+# when its version in the database changes; the version is read at most
+# once per this many seconds in each process
+PROCESS_DATA_VERSION_TTL = float(
+    os.getenv('PROCESS_DATA_VERSION_TTL', default=5),
+)
+
 
 # DRF
 DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', default=6))
@@ -124,12 +198,51 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.v1.authentication.CachedTokenAuthentication'
+        if AUTH_TOKEN_CACHE_ENABLED
+        else 'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.v1.pagination.PageLimitPagination',
     'PAGE_SIZE': DEFAULT_PAGE_SIZE,
 }
 
+# Serve list/retrieve of recipes, tags and ingredients with async views
+# (run under an ASGI server, see conf/docker/entrypoint.sh)
+ASYNC_READ_VIEWS = os.getenv('DJANGO_ASYNC_READ_VIEWS', default='0') == '1'
+
+# Pagination
+# Cached counts are invalidated through a version shared by all workers
+PAGINATION_COUNT_CACHE_ENABLED = (
+    CACHES['default']['BACKEND'] in SHARED_CACHE_BACKENDS
+)
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', default=60),
+)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', default=100000),
+)
+
+# Subscriptions
+SUBSCRIPTION_RECIPES_LIMIT = int(
+    os.getenv('SUBSCRIPTION_RECIPES_LIMIT', default=10),
+)
+# Authors with more followers are not fanned out to timelines on write,
+# their recipes are merged into feeds on read
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default=10000),
+)
+# Such authors return to fan-out on write only when they have at most this
+# many followers; their followers' feeds are then backfilled by the
+# process_feed_backfills command
+FEED_FANOUT_RESUME_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_RESUME_FOLLOWERS', default=5000),
+)
+# Ids of the authors merged into feeds on read are reloaded at most once
+# per this many seconds in each process
+FEED_READ_AUTHORS_TTL = float(os.getenv('FEED_READ_AUTHORS_TTL', default=5))
+# Number of the author's latest recipes added to the feed on subscribe
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', default=100))
+
 # Djoser
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -12,6 +12,10 @@ cp -r /app/backend_static/. /backend_static/static/
 echo "Apply migrations"
 python manage.py migrate
 
-# Start gunicorn server
+# Start gunicorn server (ASGI workers for async read views)
 echo "Start server"
-gunicorn --bind 0.0.0.0:8000 backend.wsgi
\ No newline at end of file
+if [ "$DJANGO_ASYNC_READ_VIEWS" = "1" ]; then
+    gunicorn --bind 0.0.0.0:8000 -k uvicorn.workers.UvicornWorker backend.asgi:application
+else
+    gunicorn --bind 0.0.0.0:8000 backend.wsgi
+fi
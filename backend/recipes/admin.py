@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 from django.contrib import admin
 from django.db.models import Count
 from django.db.models.query import QuerySet
+from django.forms import ModelForm
 from django.http.request import HttpRequest
 
 from .admin_filters import (
@@ -14,8 +15,10 @@ from .admin_filters import (
     RecipeAuthorFilter,
     RecipeTagFilter,
 )
+from .images import enqueue_image_processing, reset_recipe_image
 from .models import (
     FavoritesList,
+    ImageJob,
     Ingredient,
     Recipe,
     RecipeIngredient,
@@ -30,6 +33,22 @@ load_dotenv()
 ADMIN_INLINE_EXTRA = int(os.getenv('ADMIN_INLINE_LEN', default=1))
 
 
+class NameSearchMixin:
+    """Поиск по названию через NameSearchQuerySet.search_name."""
+
+    search_fields = ('name',)
+
+    def get_search_results(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet[Any],
+        search_term: str,
+    ) -> tuple[QuerySet[Any], bool]:
+        if not search_term:
+            return queryset, False
+        return queryset.search_name(search_term), False
+
+
 class RecipeIngredientInline(admin.TabularInline):
     """Конфиг для отображения ингредиентов на странице рецепта."""
 
@@ -59,18 +78,17 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(NameSearchMixin, admin.ModelAdmin):
     """Конфиг админ-зоны для модели ингредиента."""
 
     list_display = (
         'name',
         'measurement_unit',
     )
-    search_fields = ('name',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(NameSearchMixin, admin.ModelAdmin):
     """Конфиг админ-зоны для модели рецепта."""
 
     list_display = (
@@ -78,7 +96,6 @@ class RecipeAdmin(admin.ModelAdmin):
         'author',
     )
     list_filter = (RecipeAuthorFilter, RecipeTagFilter)
-    search_fields = ('name',)
     fieldsets = [
         (
             None,
@@ -86,6 +103,7 @@ class RecipeAdmin(admin.ModelAdmin):
                 'fields': [
                     'author',
                     'image',
+                    'image_status',
                     'name',
                     'text',
                     'cooking_time',
@@ -94,7 +112,7 @@ class RecipeAdmin(admin.ModelAdmin):
             },
         ),
     ]
-    readonly_fields = ['additions_to_favorites_count']
+    readonly_fields = ['image_status', 'additions_to_favorites_count']
     inlines = [RecipeIngredientInline, RecipeTagInline]
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
@@ -113,6 +131,29 @@ class RecipeAdmin(admin.ModelAdmin):
         """Сколько раз рецепт был добавлен в избранное."""
         return obj.count_favorite
 
+    def save_model(
+        self,
+        request: HttpRequest,
+        obj: Recipe,
+        form: ModelForm,
+        change: bool,
+    ) -> None:
+        """
+        Сохранение рецепта с обработкой нового изображения, как в API.
+
+        Изображение ставится в очередь фоновой обработки, а файлы прежнего
+        изображения освобождаются после фиксации транзакции.
+        """
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            previous = None
+            if change:
+                previous = (form.initial['image'].name, obj.image_variants)
+            reset_recipe_image(obj, previous=previous)
+        super().save_model(request, obj, form, change)
+        if image_changed:
+            enqueue_image_processing(obj)
+
 
 class ListConfig(admin.ModelAdmin):
     """Конфиг админ-зоны для моделей списков."""
@@ -135,3 +176,12 @@ class FavoritesListConfig(ListConfig):
 @admin.register(ShoppingCart)
 class ShoppingCartConfig(ListConfig):
     """Конфиг админ-зоны для списка покупок."""
+
+
+@admin.register(ImageJob)
+class ImageJobConfig(admin.ModelAdmin):
+    """Конфиг админ-зоны для заданий обработки изображений."""
+
+    list_display = ('recipe', 'source', 'status', 'attempts', 'run_after')
+    list_filter = ('status',)
+    readonly_fields = ('recipe', 'source', 'attempts', 'error', 'created')
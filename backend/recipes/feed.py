@@ -0,0 +1,360 @@
+import datetime
+import time
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, Q, QuerySet, Value, When, Window
+from django.db.models.functions import Now, RowNumber
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+
+from users.models import Follow
+
+from .models import FeedEntry, Recipe
+
+
+User = get_user_model()
+
+# Позиция в ленте: дата публикации и id рецепта.
+FeedPosition = tuple[datetime.datetime, int]
+
+FEED_BATCH_SIZE = 1000
+
+
+def _fanout_authors(author_ids: Iterable[int]) -> QuerySet:
+    """
+    Авторы, рецепты которых раскладываются по лентам при записи.
+
+    Рецепты остальных авторов (fan_out_on_read) добавляются в ленту при
+    чтении (см. read_feed и fan_out_mode_updates).
+    """
+    return User.objects.filter(pk__in=author_ids, fan_out_on_read=False)
+
+
+def fan_out_mode_updates(amount: int) -> dict[str, Case]:
+    """
+    Смена режима лент автора в UPDATE счетчика подписчиков.
+
+    Возвращает выражения для QuerySet.update, которое меняет
+    followers_count на amount: автор, у которого станет больше
+    FEED_FANOUT_MAX_FOLLOWERS подписчиков, переходит к добавлению рецептов
+    в ленты при чтении. Обратно автор возвращается, когда подписчиков
+    останется не больше FEED_FANOUT_RESUME_FOLLOWERS; новые рецепты
+    автора при этом не были записаны в ленты, поэтому запоминается время
+    возврата (feed_backfill_requested), и ленты подписчиков дополняются
+    в фоне (см. backfill_resumed_authors). Режим меняется тем же запросом,
+    что и счетчик, без отдельных запросов и блокировок.
+    """
+    followers_count = F('followers_count') + amount
+    switch_to_read = Q(
+        fan_out_on_read=False,
+    ) & GreaterThan(
+        followers_count,
+        settings.FEED_FANOUT_MAX_FOLLOWERS,
+    )
+    resume_write = Q(
+        fan_out_on_read=True,
+    ) & LessThanOrEqual(
+        followers_count,
+        min(
+            settings.FEED_FANOUT_RESUME_FOLLOWERS,
+            settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ),
+    )
+    return {
+        'fan_out_on_read': Case(
+            When(switch_to_read, then=Value(True)),
+            When(resume_write, then=Value(False)),
+            default=F('fan_out_on_read'),
+        ),
+        'feed_backfill_requested': Case(
+            When(resume_write, then=Now()),
+            default=F('feed_backfill_requested'),
+        ),
+    }
+
+
+def backfill_resumed_authors() -> int:
+    """
+    Дополнение лент подписчиков авторов, вернувшихся к записи в ленты.
+
+    Подписки каждого автора обрабатываются частями по FEED_BATCH_SIZE,
+    каждая часть - отдельными запросами без общей транзакции. Отметка
+    feed_backfill_requested снимается, только если за время дополнения
+    автор не вернулся к записи в ленты еще раз. Возвращает число
+    обработанных авторов.
+    """
+    authors = list(
+        User.objects.filter(
+            feed_backfill_requested__isnull=False,
+        ).values_list(
+            'pk',
+            'feed_backfill_requested',
+        ),
+    )
+    for author_id, requested in authors:
+        last_follower_id = 0
+        while follows := list(
+            Follow.objects.filter(
+                following_id=author_id,
+                follower_id__gt=last_follower_id,
+            ).order_by(
+                'follower_id',
+            ).values_list(
+                'follower_id',
+                'following_id',
+            )[:FEED_BATCH_SIZE],
+        ):
+            backfill_feeds(follows)
+            last_follower_id = follows[-1][0]
+        User.objects.filter(
+            pk=author_id,
+            feed_backfill_requested__lte=requested,
+        ).update(
+            feed_backfill_requested=None,
+        )
+    return len(authors)
+
+
+def reset_fan_out_modes() -> None:
+    """
+    Режим лент всех авторов по текущему числу подписчиков.
+
+    Отметки о дополнении лент снимаются: ленты затем перестраиваются
+    полностью (см. команду rebuild_feeds).
+    """
+    User.objects.filter(
+        fan_out_on_read=False,
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).update(
+        fan_out_on_read=True,
+    )
+    User.objects.filter(
+        fan_out_on_read=True,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).update(
+        fan_out_on_read=False,
+    )
+    User.objects.filter(
+        feed_backfill_requested__isnull=False,
+    ).update(
+        feed_backfill_requested=None,
+    )
+
+
+class FanOutOnReadAuthors:
+    """
+    Авторы, рецепты которых добавляются в ленты при чтении.
+
+    Это авторы в режиме fan_out_on_read и авторы, ленты подписчиков
+    которых еще не дополнены после возврата к записи в ленты. Таких
+    авторов немного, их id хранятся в памяти процесса и перечитываются
+    одним запросом по частичному индексу не чаще раза в
+    FEED_READ_AUTHORS_TTL секунд, поэтому смена режима автора видна при
+    чтении лент с этой задержкой.
+    """
+
+    def __init__(self) -> None:
+        self._author_ids: frozenset[int] = frozenset()
+        self._loaded_at: Optional[float] = None
+
+    def get(self) -> frozenset[int]:
+        """Id авторов."""
+        now = time.monotonic()
+        if (
+            self._loaded_at is None
+            or now - self._loaded_at >= settings.FEED_READ_AUTHORS_TTL
+        ):
+            self._author_ids = frozenset(
+                User.objects.filter(
+                    Q(fan_out_on_read=True)
+                    | Q(feed_backfill_requested__isnull=False),
+                ).values_list(
+                    'pk',
+                    flat=True,
+                ),
+            )
+            self._loaded_at = now
+        return self._author_ids
+
+    def expire(self) -> None:
+        """Перечитывание авторов при следующем обращении."""
+        self._loaded_at = None
+
+
+fan_out_on_read_authors = FanOutOnReadAuthors()
+
+
+def fan_out_recipe(recipe: Recipe) -> None:
+    """Добавление рецепта в ленты подписчиков автора."""
+    follower_ids = Follow.objects.filter(
+        following__in=_fanout_authors([recipe.author_id]),
+    ).values_list(
+        'follower_id',
+        flat=True,
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=follower_id,
+                recipe_id=recipe.pk,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+            for follower_id in follower_ids.iterator(
+                chunk_size=FEED_BATCH_SIZE,
+            )
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_recipe_from_feeds(recipe_id: int) -> None:
+    """Удаление рецепта из всех лент."""
+    FeedEntry.objects.filter(recipe_id=recipe_id).delete()
+
+
+def backfill_feeds(follows: Iterable[tuple[int, int]]) -> int:
+    """
+    Дополнение лент рецептами авторов после подписки.
+
+    follows - пары (подписчик, автор). В ленты добавляются не больше
+    FEED_BACKFILL_LIMIT последних рецептов каждого автора; все рецепты
+    выбираются одним запросом с оконной функцией. Возвращает число
+    добавленных записей.
+    """
+    follower_ids = defaultdict(set)
+    for follower_id, author_id in follows:
+        follower_ids[author_id].add(follower_id)
+    if not follower_ids:
+        return 0
+    recipes = Recipe.objects.filter(
+        author__in=_fanout_authors(list(follower_ids)),
+    ).annotate(
+        author_row_number=Window(
+            RowNumber(),
+            partition_by=F('author_id'),
+            order_by=(F('pub_date').desc(), F('pk').desc()),
+        ),
+    ).filter(
+        author_row_number__lte=settings.FEED_BACKFILL_LIMIT,
+    ).values_list(
+        'pk',
+        'author_id',
+        'pub_date',
+    )
+    entries = [
+        FeedEntry(
+            user_id=follower_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for recipe_id, author_id, pub_date in recipes
+        for follower_id in follower_ids[author_id]
+    ]
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return len(entries)
+
+
+def prune_feeds(follows: Iterable[tuple[int, int]]) -> None:
+    """Удаление рецептов авторов из лент после отписки."""
+    conditions = [
+        Q(user_id=follower_id, author_id=author_id)
+        for follower_id, author_id in follows
+    ]
+    if conditions:
+        FeedEntry.objects.filter(reduce(or_, conditions)).delete()
+
+
+def rebuild_feeds(user_ids: Iterable[int]) -> int:
+    """Полное перестроение лент пользователей; возвращает число записей."""
+    user_ids = set(user_ids)
+    with transaction.atomic():
+        FeedEntry.objects.filter(user__in=user_ids).delete()
+        return backfill_feeds(
+            Follow.objects.filter(
+                follower__in=user_ids,
+            ).values_list(
+                'follower_id',
+                'following_id',
+            ),
+        )
+
+
+def _after(
+    queryset: QuerySet,
+    position: Optional[FeedPosition],
+    id_field: str,
+) -> QuerySet:
+    """Записи, следующие в порядке ленты за позицией position."""
+    if position is None:
+        return queryset
+    pub_date, recipe_id = position
+    return queryset.filter(
+        pub_date__lte=pub_date,
+    ).exclude(
+        pub_date=pub_date,
+        **{f'{id_field}__gte': recipe_id},
+    )
+
+
+def read_feed(
+    user_id: int,
+    limit: int,
+    after: Optional[FeedPosition] = None,
+) -> list[FeedPosition]:
+    """
+    Страница ленты пользователя от новых рецептов к старым.
+
+    Записи ленты читаются одним проходом по индексу (user, pub_date).
+    Рецепты авторов из подписок, которые добавляются в ленты при чтении
+    (FanOutOnReadAuthors), выбираются отдельным запросом по индексу
+    (author, pub_date) и объединяются с записями ленты; если таких
+    авторов нет, этот запрос не выполняется.
+    """
+    positions = set(
+        _after(
+            FeedEntry.objects.filter(user_id=user_id),
+            after,
+            'recipe_id',
+        ).order_by(
+            '-pub_date',
+            '-recipe_id',
+        ).values_list(
+            'pub_date',
+            'recipe_id',
+        )[:limit],
+    )
+    author_ids = fan_out_on_read_authors.get()
+    if author_ids:
+        positions.update(
+            _after(
+                Recipe.objects.filter(
+                    author__in=Follow.objects.filter(
+                        follower_id=user_id,
+                        following_id__in=author_ids,
+                    ).values(
+                        'following_id',
+                    ),
+                ),
+                after,
+                'pk',
+            ).order_by(
+                '-pub_date',
+                '-pk',
+            ).values_list(
+                'pub_date',
+                'pk',
+            )[:limit],
+        )
+    return sorted(positions, reverse=True)[:limit]
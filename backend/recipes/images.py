@@ -0,0 +1,311 @@
+import base64
+import io
+import os
+import uuid
+from datetime import timedelta
+from typing import Any, Optional
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import ImageJob, Recipe
+
+
+# Форматы, сохраняемые без изменения; остальные перекодируются в PNG.
+OUTPUT_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+}
+
+# Принимаемые форматы и расширения сохраняемых исходных файлов.
+INPUT_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+KEPT_INFO_KEYS = ('icc_profile', 'transparency')
+IMAGE_DIRECTORY = Recipe._meta.get_field('image').upload_to
+
+
+class ImageTooLargeError(ValueError):
+    """Число пикселей изображения больше RECIPE_IMAGE_MAX_PIXELS."""
+
+
+def check_image_header(image_file: File) -> tuple[str, tuple[int, int]]:
+    """
+    Проверка изображения по заголовку файла.
+
+    Pillow читает только заголовок, поэтому изображение не декодируется
+    и не загружается в память целиком. Выбрасывает ImageTooLargeError,
+    если число пикселей больше RECIPE_IMAGE_MAX_PIXELS (защита от "бомб
+    декомпрессии"), ValueError - если формат не поддерживается, OSError -
+    если заголовок не удалось прочитать. Возвращает формат и размеры.
+    """
+    image_file.seek(0)
+    try:
+        with Image.open(image_file) as image:
+            image_format, size = image.format, image.size
+    except Image.DecompressionBombError as error:
+        raise ImageTooLargeError(error)
+    finally:
+        image_file.seek(0)
+    if image_format not in INPUT_FORMATS:
+        raise ValueError(f'Unsupported image format: {image_format}')
+    if size[0] * size[1] > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ImageTooLargeError(f'Image is too large: {size[0]}x{size[1]}')
+    return image_format, size
+
+
+def reset_recipe_image(
+    recipe: Recipe,
+    previous: Optional[tuple[str, dict[str, dict[str, str]]]] = None,
+) -> None:
+    """
+    Подготовка рецепта к сохранению с новым изображением.
+
+    До окончания фоновой обработки у рецепта image_status - processing,
+    уменьшенных копий и заглушки нет. Файлы прежнего изображения
+    previous (имя и уменьшенные копии) освобождаются после фиксации
+    транзакции. После сохранения рецепта изображение ставится в очередь
+    (enqueue_image_processing).
+    """
+    if previous is not None:
+        transaction.on_commit(lambda: release_image_files(*previous))
+    recipe.image_status = Recipe.ImageStatus.PROCESSING
+    recipe.image_variants = {}
+    recipe.image_placeholder = ''
+
+
+def enqueue_image_processing(recipe: Recipe) -> ImageJob:
+    """Постановка загруженного изображения рецепта в очередь обработки."""
+    return ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+
+
+def _open(source: io.BufferedIOBase) -> tuple[Image.Image, str]:
+    """
+    Загрузка изображения с поворотом по EXIF; возвращает и формат.
+
+    Из метаданных сохраняются только цветовой профиль и прозрачность,
+    остальные (EXIF, комментарии и т.п.) при сохранении не записываются.
+    """
+    check_image_header(source)
+    with Image.open(source) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    image.info = {
+        key: value
+        for key, value in image.info.items()
+        if key in KEPT_INFO_KEYS
+    }
+    if image_format not in OUTPUT_FORMATS:
+        image_format = 'PNG'
+    return image, image_format
+
+
+def _encode(image: Image.Image, image_format: str, **options: Any) -> bytes:
+    """Сохранение изображения в формате image_format без метаданных."""
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    options = {
+        'quality': settings.RECIPE_IMAGE_QUALITY,
+        'optimize': True,
+        **options,
+    }
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def _save_variants(
+    storage: Storage,
+    image: Image.Image,
+    image_format: str,
+    name: str,
+) -> dict[str, dict[str, str]]:
+    """
+    Сохранение уменьшенных копий изображения.
+
+    Для каждого размера из RECIPE_IMAGE_VARIANTS сохраняются копии в
+    исходном формате и в WebP. Возвращает имена файлов по размеру и
+    расширению.
+    """
+    directory = os.path.join(IMAGE_DIRECTORY, 'variants')
+    stem = os.path.splitext(os.path.basename(name))[0]
+    variants: dict[str, dict[str, str]] = {}
+    for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size))
+        variants[variant] = {}
+        for variant_format in {image_format, 'WEBP'}:
+            extension = OUTPUT_FORMATS[variant_format]
+            variant_name = os.path.join(
+                directory,
+                f'{stem}_{variant}.{extension}',
+            )
+            variants[variant][extension] = storage.save(
+                variant_name,
+                ContentFile(_encode(thumbnail, variant_format)),
+            )
+    return variants
+
+
+def _placeholder(image: Image.Image) -> str:
+    """Миниатюра для показа до загрузки изображения (data URI)."""
+    size = settings.RECIPE_IMAGE_PLACEHOLDER_SIZE
+    thumbnail = image.copy()
+    thumbnail.thumbnail((size, size))
+    content = base64.b64encode(_encode(thumbnail, 'JPEG', quality=40))
+    return f'data:image/jpeg;base64,{content.decode()}'
+
+
+def _delete_variants(
+    storage: Storage,
+    variants: dict[str, dict[str, str]],
+) -> None:
+    """Удаление файлов уменьшенных копий."""
+    for names in variants.values():
+        for name in names.values():
+            storage.delete(name)
+
+
+def release_image_files(
+    image: str,
+    variants: dict[str, dict[str, str]],
+) -> None:
+    """
+    Освобождение файлов изображения рецепта и его уменьшенных копий.
+
+    Хранилище изображений учитывает ссылки на файлы, поэтому файлы,
+    используемые другими рецептами, не удаляются.
+    """
+    storage = Recipe._meta.get_field('image').storage
+    storage.delete(image)
+    _delete_variants(storage, variants)
+
+
+def process_image_job(job: ImageJob) -> None:
+    """
+    Обработка изображения рецепта по заданию.
+
+    Изображение поворачивается по EXIF, уменьшается до
+    RECIPE_IMAGE_MAX_SIZE по большей стороне и сохраняется без
+    метаданных вместе с уменьшенными копиями и миниатюрой-заглушкой.
+    Обработанный файл заменяет исходный, только если изображение рецепта
+    не было заменено после постановки задания; исходный файл удаляется.
+    """
+    recipe = job.recipe
+    storage = recipe.image.storage
+    if recipe.image.name != job.source:
+        job.delete()
+        return
+    with storage.open(job.source, 'rb') as source:
+        image, image_format = _open(source)
+    image.thumbnail(
+        (settings.RECIPE_IMAGE_MAX_SIZE, settings.RECIPE_IMAGE_MAX_SIZE),
+    )
+    name = storage.save(
+        os.path.join(
+            IMAGE_DIRECTORY,
+            f'{uuid.uuid4()}.{OUTPUT_FORMATS[image_format]}',
+        ),
+        ContentFile(_encode(image, image_format)),
+    )
+    variants = _save_variants(storage, image, image_format, name)
+    updated = Recipe.objects.filter(
+        pk=recipe.pk,
+        image=job.source,
+    ).update(
+        image=name,
+        image_status=Recipe.ImageStatus.READY,
+        image_variants=variants,
+        image_placeholder=_placeholder(image),
+    )
+    if updated:
+        storage.delete(job.source)
+        _delete_variants(storage, recipe.image_variants)
+    else:
+        storage.delete(name)
+        _delete_variants(storage, variants)
+    job.delete()
+
+
+def generate_image_variants(recipe: Recipe) -> bool:
+    """
+    Построение уменьшенных копий и заглушки для текущего изображения.
+
+    Используется для изображений, сохраненных без фоновой обработки.
+    Возвращает False, если изображение рецепта было заменено во время
+    построения.
+    """
+    storage = recipe.image.storage
+    with recipe.image.open('rb') as source:
+        image, image_format = _open(source)
+    variants = _save_variants(storage, image, image_format, recipe.image.name)
+    updated = Recipe.objects.filter(
+        pk=recipe.pk,
+        image=recipe.image.name,
+    ).update(
+        image_variants=variants,
+        image_placeholder=_placeholder(image),
+    )
+    if updated:
+        _delete_variants(storage, recipe.image_variants)
+    else:
+        _delete_variants(storage, variants)
+    return bool(updated)
+
+
+def _fail_image_job(job: ImageJob, error: Exception) -> None:
+    """Повтор задания с задержкой или перевод в состояние ошибки."""
+    job.attempts += 1
+    job.error = repr(error)
+    if job.attempts >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+        job.status = ImageJob.Status.FAILED
+        Recipe.objects.filter(
+            pk=job.recipe_id,
+            image=job.source,
+        ).update(
+            image_status=Recipe.ImageStatus.FAILED,
+        )
+    else:
+        job.run_after = now() + timedelta(
+            seconds=settings.IMAGE_JOB_RETRY_DELAY * job.attempts,
+        )
+    job.save(update_fields=['attempts', 'error', 'status', 'run_after'])
+
+
+def run_next_image_job() -> Optional[ImageJob]:
+    """
+    Выполнение одного готового к запуску задания.
+
+    Задание блокируется на время обработки (SELECT ... FOR UPDATE SKIP
+    LOCKED), поэтому несколько обработчиков могут работать параллельно.
+    Возвращает выполненное задание или None, если очередь пуста.
+    """
+    with transaction.atomic():
+        job = ImageJob.objects.select_for_update(
+            skip_locked=True,
+            of=('self',),
+        ).select_related(
+            'recipe',
+        ).filter(
+            status=ImageJob.Status.PENDING,
+            run_after__lte=now(),
+        ).first()
+        if job is None:
+            return None
+        try:
+            with transaction.atomic():
+                process_image_job(job)
+        except Exception as error:
+            _fail_image_job(job, error)
+    return job
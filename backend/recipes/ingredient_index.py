@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import json
+from bisect import bisect_right
+from typing import Any, NamedTuple, Optional
+
+import brotli
+
+from .models import Ingredient
+from .process_cache import VersionedProcessData, invalidate_process_data
+
+
+INDEX_VERSION_KEY = 'ingredient_index_version'
+INDEX_SEPARATOR = '\x00'
+
+
+def invalidate_ingredient_index() -> None:
+    """Перестроение индекса и каталога ингредиентов во всех процессах."""
+    invalidate_process_data(INDEX_VERSION_KEY)
+
+
+class IngredientIndex(VersionedProcessData):
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Названия в нижнем регистре хранятся одной строкой, отсортированной так
+    же, как в IngredientQuerySet.order_by_is_startswith_value. Поиск
+    подстроки выполняется str.find по этой строке, поэтому результаты
+    (сначала совпадения в начале названия, затем все остальные) уже
+    упорядочены и база данных не используется.
+    """
+
+    version_key = INDEX_VERSION_KEY
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: tuple[list[dict[str, Any]], list[int], str] = (
+            [],
+            [],
+            '',
+        )
+
+    def _build(self) -> None:
+        """Загрузка всех ингредиентов одним запросом."""
+        items = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda item: (item['name'].lower(), item['id']),
+        )
+        offsets: list[int] = []
+        position = 0
+        for item in items:
+            offsets.append(position)
+            position += len(item['name'].lower()) + len(INDEX_SEPARATOR)
+        names = ''.join(
+            item['name'].lower() + INDEX_SEPARATOR for item in items
+        )
+        self._data = (items, offsets, names)
+
+    def search(self, value: str) -> list[dict[str, Any]]:
+        """Ингредиенты, содержащие value, начиная с начинающихся с value."""
+        self.refresh()
+        return self._search(value)
+
+    async def asearch(self, value: str) -> list[dict[str, Any]]:
+        """Асинхронный вариант search."""
+        await self.arefresh()
+        return self._search(value)
+
+    def _search(self, value: str) -> list[dict[str, Any]]:
+        value = value.lower()
+        if INDEX_SEPARATOR in value:
+            return []
+        items, offsets, names = self._data
+        if not items:
+            return []
+        startswith: list[dict[str, Any]] = []
+        contains: list[dict[str, Any]] = []
+        position = names.find(value)
+        while position != -1:
+            index = bisect_right(offsets, position) - 1
+            if position == offsets[index]:
+                startswith.append(items[index])
+            else:
+                contains.append(items[index])
+            if index + 1 == len(offsets):
+                break
+            position = names.find(value, offsets[index + 1])
+        return startswith + contains
+
+
+class CatalogBody(NamedTuple):
+    """Сериализованный каталог ингредиентов."""
+
+    digest: str
+    identity: bytes
+    gzip: bytes
+    br: bytes
+
+    def get_etag(self, content_encoding: Optional[str] = None) -> str:
+        """
+        Значение ETag тела в кодировке content_encoding (None - без сжатия).
+
+        Сжатые представления - разные последовательности байт, поэтому у
+        каждого свой сильный ETag с суффиксом кодировки.
+        """
+        if content_encoding is None:
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{content_encoding}"'
+
+
+class IngredientCatalog(VersionedProcessData):
+    """
+    Полный каталог ингредиентов в виде готового тела ответа.
+
+    JSON каталога (поля id, name, measurement_unit в порядке первичного
+    ключа) сериализуется и сжимается gzip и brotli один раз для каждой
+    версии данных. ETag вычисляется по содержимому (см.
+    CatalogBody.get_etag), поэтому он совпадает во всех процессах с
+    одинаковыми данными.
+    """
+
+    version_key = INDEX_VERSION_KEY
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._body: Optional[CatalogBody] = None
+
+    def _build(self) -> None:
+        identity = json.dumps(
+            list(
+                Ingredient.objects.order_by('pk').values(
+                    'id',
+                    'name',
+                    'measurement_unit',
+                ),
+            ),
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode()
+        self._body = CatalogBody(
+            digest=hashlib.sha1(identity).hexdigest(),
+            identity=identity,
+            gzip=gzip.compress(identity, compresslevel=9),
+            br=brotli.compress(identity),
+        )
+
+    def get(self) -> CatalogBody:
+        """Актуальное тело каталога."""
+        self.refresh()
+        return self._body
+
+    async def aget(self) -> CatalogBody:
+        """Асинхронный вариант get."""
+        await self.arefresh()
+        return self._body
+
+
+ingredient_index = IngredientIndex()
+ingredient_catalog = IngredientCatalog()
@@ -0,0 +1,105 @@
+import statistics
+import time
+from typing import Any, Callable, Optional
+
+from django.core.management import BaseCommand
+from django.db import connection, models, transaction
+from django.db.models import QuerySet
+from django.utils.translation import gettext_lazy as _
+
+from recipes.models import Ingredient
+
+
+DEFAULT_QUERIES = ('мол', 'сыр', 'ка', 'соус томатный')
+
+
+class Command(BaseCommand):
+    """
+    Сравнение поиска ингредиентов по названию до и после индексов.
+
+    Каталог ингредиентов дополняется синтетическими записями до
+    указанного размера, после чего для каждого запроса измеряется время
+    прежнего варианта (icontains/istartswith, UPPER(name) LIKE) и текущего
+    (LOWER(name) LIKE, обслуживается индексами на PostgreSQL). Все
+    изменения выполняются в транзакции и откатываются.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--query', action='append', dest='queries')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        queries = options['queries'] or DEFAULT_QUERIES
+        with transaction.atomic():
+            self._populate(options['rows'])
+            for value in queries:
+                before = self._measure(
+                    lambda: self._legacy_queryset(value),
+                    options['repeat'],
+                )
+                after = self._measure(
+                    lambda: Ingredient.objects.search_name(
+                        value,
+                    ).order_by_is_startswith_value(value),
+                    options['repeat'],
+                )
+                self.stdout.write(
+                    f'"{value}": до {before[0]:.2f} мс ({before[1]}), '
+                    f'после {after[0]:.2f} мс ({after[1]})',
+                )
+            transaction.set_rollback(True)
+
+    def _populate(self, rows: int) -> None:
+        """Дополнение каталога синтетическими ингредиентами."""
+        names = list(
+            Ingredient.objects.values_list('name', flat=True)[:1000],
+        ) or ['ингредиент']
+        missing = rows - Ingredient.objects.count()
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=f'{names[i % len(names)]} {i}',
+                    measurement_unit='г',
+                )
+                for i in range(max(missing, 0))
+            ),
+            batch_size=5000,
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE recipes_ingredient')
+        self.stdout.write(
+            _(f'Ингредиентов в каталоге: {Ingredient.objects.count()}'),
+        )
+
+    def _legacy_queryset(self, value: str) -> QuerySet:
+        """Запрос в прежнем виде (icontains и istartswith)."""
+        return Ingredient.objects.filter(
+            name__icontains=value,
+        ).alias(
+            is_startswith=models.Case(
+                models.When(name__istartswith=value, then=True),
+                default=False,
+            ),
+        ).order_by(
+            '-is_startswith',
+            models.functions.Lower('name'),
+        )
+
+    def _measure(
+        self,
+        get_queryset: Callable[[], QuerySet],
+        repeat: int,
+    ) -> tuple[float, str]:
+        """Медианное время выполнения в мс и признак использования индекса."""
+        timings = []
+        for attempt in range(repeat):
+            start = time.perf_counter()
+            list(get_queryset())
+            timings.append((time.perf_counter() - start) * 1000)
+        plan = 'n/a'
+        if connection.vendor == 'postgresql':
+            explain = get_queryset().explain()
+            plan = 'index' if 'Index' in explain else 'seq scan'
+        return statistics.median(timings), plan
@@ -0,0 +1,104 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+
+DEFAULT_PATHS = (
+    '/api/recipes/?limit=6',
+    '/api/recipes/?tags=breakfast&tags=lunch',
+    '/api/tags/',
+    '/api/ingredients/?name=мол',
+)
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочное сравнение эндпоинтов чтения.
+
+    Для каждого адреса сервера (--url) и каждого пути выполняется
+    --requests запросов в --concurrency потоков, после чего выводятся
+    пропускная способность, медиана и 99-й перцентиль задержки. Для
+    сравнения режимов запустите бэкенд дважды: с синхронными воркерами
+    gunicorn (WSGI) и с DJANGO_ASYNC_READ_VIEWS=1 под ASGI-воркером, и
+    передайте оба адреса.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True)
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--token')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        for base_url in options['url']:
+            self.stdout.write(self.style.SUCCESS(base_url))
+            for path in options['paths'] or DEFAULT_PATHS:
+                url = base_url.rstrip('/') + urllib.request.quote(
+                    path,
+                    safe='/?&=',
+                )
+                self._fetch(url, headers)
+                elapsed, timings, errors = self._run(
+                    url,
+                    headers,
+                    options['requests'],
+                    options['concurrency'],
+                )
+                self.stdout.write(self._format(path, elapsed, timings, errors))
+
+    def _fetch(self, url: str, headers: dict[str, str]) -> float:
+        """Время одного запроса в мс; ошибка HTTP - исключение."""
+        request = urllib.request.Request(url, headers=headers)
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000
+
+    def _run(
+        self,
+        url: str,
+        headers: dict[str, str],
+        requests: int,
+        concurrency: int,
+    ) -> tuple[float, list[float], int]:
+        """Выполнение запросов; общее время в с, задержки и число ошибок."""
+
+        def fetch(_: int) -> Optional[float]:
+            try:
+                return self._fetch(url, headers)
+            except (urllib.error.URLError, OSError):
+                return None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(requests)))
+        elapsed = time.perf_counter() - start
+        timings = [timing for timing in results if timing is not None]
+        return elapsed, timings, len(results) - len(timings)
+
+    def _format(
+        self,
+        path: str,
+        elapsed: float,
+        timings: list[float],
+        errors: int,
+    ) -> str:
+        """Строка отчета для одного пути."""
+        if len(timings) < 2:
+            return _(f'  {path}: ошибок - {errors}')
+        return _(
+            f'  {path}: {len(timings) / elapsed:.1f} запр./с, '
+            f'p50 {statistics.median(timings):.1f} мс, '
+            f'p99 {statistics.quantiles(timings, n=100)[98]:.1f} мс, '
+            f'ошибок - {errors}',
+        )
@@ -0,0 +1,45 @@
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.images import generate_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Построение уменьшенных копий изображений рецептов.
+
+    Обрабатываются рецепты с готовым изображением без уменьшенных копий
+    (например, загруженные командой upload_json или до появления копий);
+    с параметром --force копии строятся заново для всех рецептов.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        recipes = Recipe.objects.filter(
+            image_status=Recipe.ImageStatus.READY,
+        ).exclude(
+            image='',
+        ).only(
+            'image',
+            'image_variants',
+        ).order_by(
+            'pk',
+        )
+        if not options['force']:
+            recipes = recipes.filter(image_variants={})
+        processed = 0
+        for recipe in recipes.iterator():
+            try:
+                processed += generate_image_variants(recipe)
+            except OSError as error:
+                self.stderr.write(
+                    _(f'Ошибка обработки {recipe.image.name}: {error}'),
+                )
+        self.stdout.write(
+            self.style.SUCCESS(_(f'Обработано изображений: {processed}.')),
+        )
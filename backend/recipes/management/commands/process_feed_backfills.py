@@ -0,0 +1,39 @@
+import time
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.feed import backfill_resumed_authors
+
+
+class Command(BaseCommand):
+    """
+    Фоновое дополнение лент подписок.
+
+    Ленты подписчиков авторов, вернувшихся к записи рецептов в ленты,
+    дополняются последними рецептами этих авторов (см.
+    recipes.feed.backfill_resumed_authors); когда таких авторов нет,
+    обработчик ждет --sleep секунд. С параметром --once команда
+    завершается после одного прохода.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=10)
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        processed = 0
+        while True:
+            authors_count = backfill_resumed_authors()
+            processed += authors_count
+            if authors_count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                _(f'Дополнены ленты подписчиков авторов: {processed}.'),
+            ),
+        )
@@ -0,0 +1,40 @@
+import time
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.images import run_next_image_job
+from recipes.models import ImageJob
+
+
+class Command(BaseCommand):
+    """
+    Фоновая обработка изображений рецептов.
+
+    Задания из таблицы ImageJob выполняются по одному; когда очередь
+    пуста, обработчик ждет --sleep секунд. С параметром --once команда
+    завершается после обработки всех готовых заданий.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=2)
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        processed = 0
+        while True:
+            job = run_next_image_job()
+            if job is not None:
+                processed += 1
+                if job.status == ImageJob.Status.FAILED:
+                    self.stderr.write(
+                        _(f'Ошибка обработки {job.source}: {job.error}'),
+                    )
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(
+            self.style.SUCCESS(_(f'Обработано заданий: {processed}.')),
+        )
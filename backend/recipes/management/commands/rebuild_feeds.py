@@ -0,0 +1,51 @@
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.feed import rebuild_feeds, reset_fan_out_modes
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Перестроение лент подписок.
+
+    Режимы лент авторов выставляются по текущему числу подписчиков, затем
+    ленты всех пользователей заполняются заново последними рецептами
+    авторов из подписок частями по --chunk-size пользователей, каждая
+    часть - в отдельной транзакции. Выполняется после загрузки данных в
+    обход сигналов и после изменения FEED_FANOUT_MAX_FOLLOWERS.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        reset_fan_out_modes()
+        last_pk = 0
+        users_count = entries_count = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(
+                    pk__gt=last_pk,
+                ).order_by(
+                    'pk',
+                ).values_list(
+                    'pk',
+                    flat=True,
+                )[:options['chunk_size']],
+            )
+            if not user_ids:
+                break
+            entries_count += rebuild_feeds(user_ids)
+            users_count += len(user_ids)
+            last_pk = user_ids[-1]
+        self.stdout.write(
+            self.style.SUCCESS(
+                _(
+                    f'Ленты подписок перестроены: пользователей - '
+                    f'{users_count}, записей - {entries_count}.',
+                ),
+            ),
+        )
@@ -0,0 +1,48 @@
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Перестроение агрегатов списков покупок.
+
+    Агрегаты всех пользователей пересчитываются из списков покупок
+    частями по --chunk-size пользователей, каждая часть - в отдельной
+    транзакции.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        last_pk = 0
+        users_count = items_count = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(
+                    pk__gt=last_pk,
+                ).order_by(
+                    'pk',
+                ).values_list(
+                    'pk',
+                    flat=True,
+                )[:options['chunk_size']],
+            )
+            if not user_ids:
+                break
+            items_count += rebuild_shopping_lists(user_ids)
+            users_count += len(user_ids)
+            last_pk = user_ids[-1]
+        self.stdout.write(
+            self.style.SUCCESS(
+                _(
+                    f'Списки покупок перестроены: пользователей - '
+                    f'{users_count}, позиций - {items_count}.',
+                ),
+            ),
+        )
@@ -0,0 +1,37 @@
+from datetime import timedelta
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy as _
+
+from recipes.images import IMAGE_DIRECTORY
+from recipes.storage import get_recipe_image_storage
+
+
+class Command(BaseCommand):
+    """
+    Удаление файлов изображений, оставшихся после отката транзакций.
+
+    Удаляются файлы хранилища изображений рецептов с именами по
+    содержимому, для которых нет записи MediaFile и которые изменены
+    больше --min-age секунд назад. С параметром --dry-run файлы только
+    выводятся.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        storage = get_recipe_image_storage()
+        before = now() - timedelta(seconds=options['min_age'])
+        deleted = 0
+        for name in storage.find_orphans(IMAGE_DIRECTORY, before):
+            if options['dry_run']:
+                self.stdout.write(name)
+            elif storage.delete_orphan(name):
+                deleted += 1
+        self.stdout.write(
+            self.style.SUCCESS(_(f'Удалено файлов: {deleted}.')),
+        )
@@ -1,8 +1,9 @@
 from typing import Any, Optional
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, call_command
 from django.utils.translation import gettext_lazy as _
 
+from recipes.ingredient_index import invalidate_ingredient_index
 from recipes.models import (
     FavoritesList,
     Ingredient,
@@ -12,6 +13,8 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.shopping_list import rebuild_shopping_lists
+from recipes.tag_registry import invalidate_tag_registry
 from users.models import Follow, User
 
 from ._utils import JSONLoader
@@ -118,3 +121,10 @@ class Command(BaseCommand):
                         f'загрузке данных: {e}',
                     ),
                 )
+        Recipe.objects.update_tags_index()
+        invalidate_ingredient_index()
+        invalidate_tag_registry()
+        rebuild_shopping_lists(User.objects.values_list('pk', flat=True))
+        call_command('reconcile_user_counters', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        call_command('generate_image_variants', stdout=self.stdout)
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.2 on 2026-10-18 01:27
+
+from django.db import migrations, models
+
+
+def fill_tags_index(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    recipes = list(Recipe.objects.prefetch_related("recipe_tags"))
+    for recipe in recipes:
+        recipe.tags_index = {
+            str(recipe_tag.tag_id): True for recipe_tag in recipe.recipe_tags.all()
+        }
+    Recipe.objects.bulk_update(recipes, ["tags_index"], batch_size=1000)
+
+
+def create_tags_index_gin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS recipe_tags_index_gin "
+            "ON recipes_recipe USING gin (tags_index)"
+        )
+
+
+def drop_tags_index_gin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS recipe_tags_index_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="tags_index",
+            field=models.JSONField(
+                default=dict, editable=False, verbose_name="Индекс тегов"
+            ),
+        ),
+        migrations.RunPython(fill_tags_index, migrations.RunPython.noop),
+        migrations.RunPython(create_tags_index_gin, drop_tags_index_gin),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+NAME_SEARCH_INDEXES = (
+    (
+        "ingredient_name_lower_idx",
+        "recipes_ingredient",
+        "btree (LOWER(name))",
+    ),
+    (
+        "ingredient_name_trgm_idx",
+        "recipes_ingredient",
+        "gin (LOWER(name) gin_trgm_ops)",
+    ),
+    (
+        "recipe_name_lower_idx",
+        "recipes_recipe",
+        "btree (LOWER(name))",
+    ),
+    (
+        "recipe_name_trgm_idx",
+        "recipes_recipe",
+        "gin (LOWER(name) gin_trgm_ops)",
+    ),
+)
+
+
+def create_name_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, definition in NAME_SEARCH_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING {definition}"
+        )
+
+
+def drop_name_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in NAME_SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_recipe_tags_index"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_name_search_indexes, drop_name_search_indexes),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.2 on 2026-10-18 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_list_items(apps, schema_editor):
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    ShoppingListItem = apps.get_model("recipes", "ShoppingListItem")
+    user_field = "recipe__shoppingcart_related__user"
+    totals = (
+        RecipeIngredient.objects.filter(**{f"{user_field}__isnull": False})
+        .order_by()
+        .values(user_field, "ingredient")
+        .annotate(
+            total_amount=models.Sum("amount"),
+            total_recipes=models.Count("recipe"),
+        )
+    )
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=total[user_field],
+                ingredient_id=total["ingredient"],
+                amount=total["total_amount"],
+                recipes_count=total["total_recipes"],
+            )
+            for total in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0003_name_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingListItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.PositiveIntegerField(verbose_name="Количество")),
+                (
+                    "recipes_count",
+                    models.PositiveIntegerField(verbose_name="Число рецептов"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_list_items",
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_list_items",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Позиция списка покупок",
+                "verbose_name_plural": "Позиции списков покупок",
+                "ordering": ["user", "ingredient"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="shoppinglistitem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_list_user_ingredient",
+            ),
+        ),
+        migrations.RunPython(fill_shopping_list_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.2 on 2026-10-18 01:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_shopping_list_item"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("processing", "Обрабатывается"),
+                    ("ready", "Готово"),
+                    ("failed", "Ошибка обработки"),
+                ],
+                default="ready",
+                editable=False,
+                max_length=16,
+                verbose_name="Состояние изображения",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ImageJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(max_length=255, verbose_name="Исходный файл"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "Ожидает"), ("failed", "Ошибка")],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="Состояние",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="Попытки"),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка")),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Выполнить после",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_jobs",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задание обработки изображения",
+                "verbose_name_plural": "Задания обработки изображений",
+                "ordering": ["run_after", "pk"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="image_job_status_run_after",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.2 on 2026-10-18 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_image_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Заглушка изображения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_variants",
+            field=models.JSONField(
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии изображения",
+            ),
+        ),
+    ]
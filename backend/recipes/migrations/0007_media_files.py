@@ -0,0 +1,52 @@
+# Generated by Django 4.2.2 on 2026-10-18 01:44
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Имя файла"
+                    ),
+                ),
+                (
+                    "refs",
+                    models.PositiveIntegerField(default=0, verbose_name="Число ссылок"),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл",
+                "verbose_name_plural": "Файлы",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=recipes.storage.get_recipe_image_storage,
+                upload_to="recipes/images/",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
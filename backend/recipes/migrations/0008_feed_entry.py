@@ -0,0 +1,131 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import RowNumber
+
+
+def fill_feed_entries(apps, schema_editor):
+    Follow = apps.get_model("users", "Follow")
+    Recipe = apps.get_model("recipes", "Recipe")
+    FeedEntry = apps.get_model("recipes", "FeedEntry")
+    recipes = (
+        Recipe.objects.filter(
+            author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        )
+        .annotate(
+            author_row_number=models.Window(
+                RowNumber(),
+                partition_by=models.F("author_id"),
+                order_by=(models.F("pub_date").desc(), models.F("pk").desc()),
+            ),
+        )
+        .filter(author_row_number__lte=settings.FEED_BACKFILL_LIMIT)
+        .values_list("pk", "author_id", "pub_date")
+    )
+    follower_ids = {}
+    for follower_id, author_id in Follow.objects.values_list(
+        "follower_id", "following_id"
+    ).iterator():
+        follower_ids.setdefault(author_id, []).append(follower_id)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=follower_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, author_id, pub_date in recipes.iterator()
+            for follower_id in follower_ids.get(author_id, ())
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0007_media_files"),
+        ("users", "0002_user_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("pub_date", models.DateTimeField(verbose_name="publication date")),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи лент",
+                "ordering": ["user", "-pub_date", "-recipe_id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-pub_date"], name="recipe_author_pub_date_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="author",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Автор",
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Пользователь",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["user", "-pub_date", "-recipe"], name="feed_entry_user_pub_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["user", "author"], name="feed_entry_user_author"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry_user_recipe"
+            ),
+        ),
+        migrations.RunPython(fill_feed_entries, migrations.RunPython.noop),
+    ]
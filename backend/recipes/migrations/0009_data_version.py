@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_feed_entry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Название",
+                    ),
+                ),
+                ("version", models.CharField(max_length=32, verbose_name="Версия")),
+            ],
+            options={
+                "verbose_name": "Версия данных",
+                "verbose_name_plural": "Версии данных",
+                "ordering": ["name"],
+            },
+        ),
+    ]
@@ -1,12 +1,15 @@
 import os
+from typing import Iterable
 
 from dotenv import load_dotenv
 
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from .storage import get_recipe_image_storage
 from .validators import HexColorValidator
 
 
@@ -38,7 +41,26 @@ class Tag(models.Model):
         return self.slug[:STR_MAX_LENGTH]
 
 
-class IngredientQuerySet(models.QuerySet):
+class NameSearchQuerySet(models.QuerySet):
+    """
+    Поиск по названию без учета регистра.
+
+    Условия строятся над LOWER(name), поэтому на PostgreSQL их обслуживают
+    функциональный индекс по Lower(name) и триграммный GIN-индекс по тому
+    же выражению (icontains/istartswith компилируются в UPPER(...) LIKE и
+    эти индексы не используют).
+    """
+
+    def search_name(self, value: str):
+        """Объекты, название которых содержит value."""
+        return self.alias(
+            name_lower=models.functions.Lower('name'),
+        ).filter(
+            name_lower__contains=value.lower(),
+        )
+
+
+class IngredientQuerySet(NameSearchQuerySet):
     """Дополнительный метод для менеджера модели ингредиентов."""
 
     def order_by_is_startswith_value(self, value):
@@ -51,14 +73,19 @@ class IngredientQuerySet(models.QuerySet):
         сортируются по полученному значению (от True к False).
         """
         is_startswith_value = models.Case(
-            models.When(name__istartswith=value, then=models.Value(True)),
+            models.When(
+                name_lower__startswith=value.lower(),
+                then=models.Value(True),
+            ),
             default=models.Value(False),
         )
         return self.alias(
+            name_lower=models.functions.Lower('name'),
+        ).alias(
             is_startswith=is_startswith_value,
         ).order_by(
             '-is_startswith',
-            models.functions.Lower('name'),
+            'name_lower',
         )
 
 
@@ -90,9 +117,44 @@ class Ingredient(models.Model):
         return self.name[:STR_MAX_LENGTH]
 
 
+def build_tags_index(tag_ids: Iterable[int]) -> dict[str, bool]:
+    """Значение поля tags_index для набора id тегов."""
+    return {str(tag_id): True for tag_id in tag_ids}
+
+
+class RecipeQuerySet(NameSearchQuerySet):
+    """Дополнительные методы для менеджера модели рецептов."""
+
+    def update_tags_index(self) -> int:
+        """
+        Пересчет денормализованного набора тегов рецептов.
+
+        В поле tags_index хранится словарь, ключами которого являются
+        id тегов рецепта. Поиск по ключам (has_keys/has_any_keys)
+        выполняется одним условием без JOIN с таблицами тегов.
+        """
+        recipes = list(self.prefetch_related('recipe_tags'))
+        for recipe in recipes:
+            recipe.tags_index = build_tags_index(
+                recipe_tag.tag_id for recipe_tag in recipe.recipe_tags.all()
+            )
+        return self.model.objects.bulk_update(
+            recipes,
+            ['tags_index'],
+            batch_size=1000,
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
+    class ImageStatus(models.TextChoices):
+        """Состояние обработки изображения рецепта."""
+
+        PROCESSING = 'processing', _('Обрабатывается')
+        READY = 'ready', _('Готово')
+        FAILED = 'failed', _('Ошибка обработки')
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -111,8 +173,26 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/images/',
+        storage=get_recipe_image_storage,
         verbose_name=_('Изображение'),
     )
+    image_status = models.CharField(
+        _('Состояние изображения'),
+        max_length=16,
+        choices=ImageStatus.choices,
+        default=ImageStatus.READY,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        _('Уменьшенные копии изображения'),
+        default=dict,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        _('Заглушка изображения'),
+        blank=True,
+        editable=False,
+    )
     name = models.CharField(_('Название'), max_length=200)
     text = models.TextField(_('Описание'))
     cooking_time = models.PositiveSmallIntegerField(
@@ -125,6 +205,11 @@ class Recipe(models.Model):
         ],
     )
     pub_date = models.DateTimeField(_('publication date'), auto_now_add=True)
+    tags_index = models.JSONField(
+        _('Индекс тегов'),
+        default=dict,
+        editable=False,
+    )
     favorites = models.ManyToManyField(
         User,
         through='FavoritesList',
@@ -136,12 +221,22 @@ class Recipe(models.Model):
         related_name='shopping_cart_recipes',
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = _('Рецепт')
         verbose_name_plural = _('Рецепты')
         indexes = [
             models.Index(fields=['name'], name='recipe_name_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            ),
         ]
 
     def __str__(self) -> str:
@@ -259,3 +354,187 @@ class FavoritesList(ListModel):
     class Meta(ListModel.Meta):
         verbose_name = _('Избранное')
         verbose_name_plural = _('Избранное')
+
+
+class ShoppingListItem(models.Model):
+    """
+    Агрегат списка покупок пользователя по ингредиенту.
+
+    Хранит суммарное количество ингредиента во всех рецептах из списка
+    покупок пользователя и число этих рецептов. Поддерживается функциями
+    модуля recipes.shopping_list.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name=_('Пользователь'),
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name=_('Ингредиент'),
+    )
+    amount = models.PositiveIntegerField(_('Количество'))
+    recipes_count = models.PositiveIntegerField(_('Число рецептов'))
+
+    class Meta:
+        ordering = ['user', 'ingredient']
+        verbose_name = _('Позиция списка покупок')
+        verbose_name_plural = _('Позиции списков покупок')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_user_ingredient',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user} - {self.ingredient}'
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок пользователя.
+
+    Рецепт автора попадает в ленты его подписчиков при публикации, при
+    подписке лента дополняется последними рецептами автора, при отписке
+    - очищается от них (см. recipes.feed). Дата публикации хранится в
+    записи, поэтому страница ленты читается по индексу (user, pub_date)
+    без обращения к таблице рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name=_('Пользователь'),
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name=_('Рецепт'),
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Автор'),
+    )
+    pub_date = models.DateTimeField(_('publication date'))
+
+    class Meta:
+        ordering = ['user', '-pub_date', '-recipe_id']
+        verbose_name = _('Запись ленты')
+        verbose_name_plural = _('Записи лент')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_user_pub_date',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_entry_user_author',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry_user_recipe',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user} - {self.recipe}'
+
+
+class ImageJob(models.Model):
+    """
+    Задание фоновой обработки изображения рецепта.
+
+    Создается при загрузке изображения через API и выполняется командой
+    process_image_jobs (см. recipes.images). После успешной обработки
+    задание удаляется.
+    """
+
+    class Status(models.TextChoices):
+        """Состояние задания."""
+
+        PENDING = 'pending', _('Ожидает')
+        FAILED = 'failed', _('Ошибка')
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+        verbose_name=_('Рецепт'),
+    )
+    source = models.CharField(_('Исходный файл'), max_length=255)
+    status = models.CharField(
+        _('Состояние'),
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(_('Попытки'), default=0)
+    error = models.TextField(_('Ошибка'), blank=True)
+    run_after = models.DateTimeField(_('Выполнить после'), default=now)
+    created = models.DateTimeField(_('Создано'), auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_after', 'pk']
+        verbose_name = _('Задание обработки изображения')
+        verbose_name_plural = _('Задания обработки изображений')
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='image_job_status_run_after',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.recipe} - {self.source}'
+
+
+class MediaFile(models.Model):
+    """
+    Файл в хранилище с адресацией по содержимому.
+
+    Число ссылок на файл поддерживается хранилищем
+    recipes.storage.ContentAddressedStorage.
+    """
+
+    name = models.CharField(_('Имя файла'), max_length=255, unique=True)
+    refs = models.PositiveIntegerField(_('Число ссылок'), default=0)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _('Файл')
+        verbose_name_plural = _('Файлы')
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class DataVersion(models.Model):
+    """
+    Версия данных, которые хранятся в памяти процессов.
+
+    Версия меняется в той же транзакции, что и данные (см.
+    recipes.process_cache), поэтому после ее фиксации все процессы
+    перестраивают данные по зафиксированному состоянию.
+    """
+
+    name = models.CharField(_('Название'), max_length=64, primary_key=True)
+    version = models.CharField(_('Версия'), max_length=32)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _('Версия данных')
+        verbose_name_plural = _('Версии данных')
+
+    def __str__(self) -> str:
+        return self.name
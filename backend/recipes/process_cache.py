@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import DataVersion
+
+
+# Число сбросов версий в текущем процессе: после сброса версии
+# перечитываются сразу, не дожидаясь PROCESS_DATA_VERSION_TTL.
+_local_invalidations = 0
+
+
+def _new_version() -> dict[str, str]:
+    return {'version': uuid.uuid4().hex}
+
+
+def expire_process_data() -> None:
+    """Проверка версий всех данных процесса при следующем обращении."""
+    global _local_invalidations
+    _local_invalidations += 1
+
+
+def invalidate_process_data(version_key: str) -> None:
+    """
+    Смена версии данных; процессы перестроят их при следующем запросе.
+
+    Версия обновляется в текущей транзакции и становится видна другим
+    процессам вместе с изменением данных, не позже чем через
+    PROCESS_DATA_VERSION_TTL секунд. Текущий процесс перечитывает версию
+    сразу и еще раз после фиксации транзакции.
+    """
+    DataVersion.objects.update_or_create(
+        name=version_key,
+        defaults=_new_version(),
+    )
+    expire_process_data()
+    transaction.on_commit(expire_process_data)
+
+
+class VersionedProcessData:
+    """
+    Данные в памяти процесса, перестраиваемые при смене версии.
+
+    Версия хранится в базе данных (модель DataVersion) под названием
+    version_key и читается одним запросом по первичному ключу не чаще
+    раза в PROCESS_DATA_VERSION_TTL секунд, а также после сброса версии
+    в этом процессе. Данные строятся методом _build при первом обращении
+    и перестраиваются, когда версия меняется (см. invalidate_process_data).
+    Версия читается до построения данных, поэтому данные никогда не
+    помечаются более новой версией, чем та, по которой они построены.
+    """
+
+    version_key: str
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self._checked_invalidations = 0
+
+    def _is_checked(self) -> bool:
+        """Версия проверялась недавно и не сбрасывалась с тех пор."""
+        return (
+            self._checked_at is not None
+            and time.monotonic() - self._checked_at
+            < settings.PROCESS_DATA_VERSION_TTL
+            and self._checked_invalidations == _local_invalidations
+        )
+
+    def _mark_checked(self, invalidations: int, checked_at: float) -> None:
+        self._checked_invalidations = invalidations
+        self._checked_at = checked_at
+
+    def _get_version(self) -> str:
+        try:
+            data_version = DataVersion.objects.get(name=self.version_key)
+        except DataVersion.DoesNotExist:
+            data_version, _ = DataVersion.objects.get_or_create(
+                name=self.version_key,
+                defaults=_new_version(),
+            )
+        return data_version.version
+
+    def _build(self) -> None:
+        raise NotImplementedError
+
+    def _rebuild(self, version: str) -> None:
+        with self._lock:
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def refresh(self) -> None:
+        """Перестроение данных, если их версия устарела."""
+        if self._is_checked():
+            return
+        invalidations = _local_invalidations
+        checked_at = time.monotonic()
+        version = self._get_version()
+        if version != self._version:
+            self._rebuild(version)
+        self._mark_checked(invalidations, checked_at)
+
+    async def arefresh(self) -> None:
+        """Асинхронный вариант refresh: данные строятся в потоке."""
+        if self._is_checked():
+            return
+        invalidations = _local_invalidations
+        checked_at = time.monotonic()
+        version = await sync_to_async(self._get_version)()
+        if version != self._version:
+            await sync_to_async(self._rebuild)(version)
+        self._mark_checked(invalidations, checked_at)
@@ -0,0 +1,136 @@
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from django.db import transaction
+
+from .models import Recipe, RecipeIngredient, RecipeTag, build_tags_index
+from .shopping_list import refresh_recipe_in_shopping_lists
+
+
+_writing_relations: ContextVar[bool] = ContextVar(
+    'writing_recipe_relations',
+    default=False,
+)
+
+
+def is_writing_relations() -> bool:
+    """
+    Признак записи связей рецепта через save_recipe.
+
+    Обработчики сигналов отдельных строк RecipeIngredient и RecipeTag
+    в это время не выполняются: производные данные обновляет save_recipe.
+    """
+    return _writing_relations.get()
+
+
+def _write_ingredients(
+    recipe: Recipe,
+    amounts: dict[int, int],
+    created: bool,
+) -> set[int]:
+    """
+    Применение разницы между текущими и новыми ингредиентами рецепта.
+
+    Возвращает id ингредиентов, которые были добавлены, удалены или
+    количество которых изменилось.
+    """
+    existing: dict[int, RecipeIngredient] = {}
+    if not created:
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe,
+            ).only('id', 'ingredient_id', 'amount')
+        }
+    removed = existing.keys() - amounts.keys()
+    added = amounts.keys() - existing.keys()
+    changed = [
+        existing[ingredient_id]
+        for ingredient_id in existing.keys() & amounts.keys()
+        if existing[ingredient_id].amount != amounts[ingredient_id]
+    ]
+    if removed:
+        RecipeIngredient.objects.filter(
+            recipe=recipe,
+            ingredient_id__in=removed,
+        ).delete()
+    if changed:
+        for recipe_ingredient in changed:
+            recipe_ingredient.amount = amounts[recipe_ingredient.ingredient_id]
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+    if added:
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amounts[ingredient_id],
+            )
+            for ingredient_id in added
+        )
+    return (
+        removed
+        | added
+        | {recipe_ingredient.ingredient_id for recipe_ingredient in changed}
+    )
+
+
+def _write_tags(recipe: Recipe, tag_ids: set[int], created: bool) -> None:
+    """Применение разницы между текущими и новыми тегами рецепта."""
+    existing: set[int] = set()
+    if not created:
+        existing = set(
+            RecipeTag.objects.filter(
+                recipe=recipe,
+            ).values_list(
+                'tag_id',
+                flat=True,
+            ),
+        )
+    if existing - tag_ids:
+        RecipeTag.objects.filter(
+            recipe=recipe,
+            tag_id__in=existing - tag_ids,
+        ).delete()
+    if tag_ids - existing:
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids - existing
+        )
+
+
+def save_recipe(
+    recipe: Recipe,
+    amounts: Optional[dict[int, int]] = None,
+    tag_ids: Optional[Iterable[int]] = None,
+) -> Recipe:
+    """
+    Сохранение рецепта вместе с ингредиентами и тегами.
+
+    amounts - количество по id ингредиента, tag_ids - id тегов; None
+    оставляет связи без изменений. Связи изменяются по разнице со
+    старым набором: для каждой промежуточной модели выполняется не больше
+    одного bulk_create, одного bulk_update и одного DELETE в общей
+    транзакции.
+
+    bulk_create и bulk_update не отправляют post_save, а обработчики
+    удаления отдельных строк на это время отключены (is_writing_relations),
+    поэтому индекс тегов записывается вместе с рецептом, а агрегаты
+    списков покупок пересчитываются для измененных ингредиентов явно.
+    """
+    created = recipe.pk is None
+    token = _writing_relations.set(True)
+    try:
+        with transaction.atomic():
+            if tag_ids is not None:
+                tag_ids = set(tag_ids)
+                recipe.tags_index = build_tags_index(tag_ids)
+            recipe.save()
+            if tag_ids is not None:
+                _write_tags(recipe, tag_ids, created)
+            if amounts is not None:
+                changed = _write_ingredients(recipe, amounts, created)
+                if changed and not created:
+                    refresh_recipe_in_shopping_lists(recipe.pk, changed)
+    finally:
+        _writing_relations.reset(token)
+    return recipe
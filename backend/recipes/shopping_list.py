@@ -0,0 +1,104 @@
+from typing import Iterable, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+User = get_user_model()
+
+USER_FIELD = 'recipe__shoppingcart_related__user'
+
+
+def _lock_users(user_ids: set[int]) -> None:
+    """Блокировка пользователей для последовательного пересчета."""
+    list(
+        User.objects.select_for_update().filter(
+            pk__in=user_ids,
+        ).order_by(
+            'pk',
+        ).values_list(
+            'pk',
+            flat=True,
+        ),
+    )
+
+
+def _collect_items(
+    user_ids: set[int],
+    ingredient_ids: Optional[Iterable[int]] = None,
+) -> list[ShoppingListItem]:
+    """Агрегация ингредиентов из рецептов в списках покупок."""
+    queryset = RecipeIngredient.objects.filter(
+        **{f'{USER_FIELD}__in': user_ids},
+    )
+    if ingredient_ids is not None:
+        queryset = queryset.filter(ingredient__in=ingredient_ids)
+    totals = queryset.order_by().values(
+        USER_FIELD,
+        'ingredient',
+    ).annotate(
+        total_amount=Sum('amount'),
+        total_recipes=Count('recipe'),
+    )
+    return [
+        ShoppingListItem(
+            user_id=total[USER_FIELD],
+            ingredient_id=total['ingredient'],
+            amount=total['total_amount'],
+            recipes_count=total['total_recipes'],
+        )
+        for total in totals
+    ]
+
+
+def refresh_shopping_list(
+    user_ids: Iterable[int],
+    ingredient_ids: Iterable[int],
+) -> None:
+    """
+    Пересчет агрегата для пар (пользователь, ингредиент).
+
+    Пересчитываются только указанные пары, поэтому стоимость изменения
+    пропорциональна числу затронутых ингредиентов, а не размеру списка.
+    """
+    user_ids, ingredient_ids = set(user_ids), set(ingredient_ids)
+    if not user_ids or not ingredient_ids:
+        return
+    with transaction.atomic():
+        _lock_users(user_ids)
+        items = _collect_items(user_ids, ingredient_ids)
+        ShoppingListItem.objects.filter(
+            user__in=user_ids,
+            ingredient__in=ingredient_ids,
+        ).delete()
+        ShoppingListItem.objects.bulk_create(items)
+
+
+def refresh_recipe_in_shopping_lists(
+    recipe_id: int,
+    ingredient_ids: Iterable[int],
+) -> None:
+    """Пересчет агрегата у всех пользователей с рецептом в списке покупок."""
+    refresh_shopping_list(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list(
+            'user_id',
+            flat=True,
+        ),
+        ingredient_ids,
+    )
+
+
+def rebuild_shopping_lists(user_ids: Iterable[int]) -> int:
+    """Полное перестроение агрегата для пользователей."""
+    user_ids = set(user_ids)
+    with transaction.atomic():
+        _lock_users(user_ids)
+        items = _collect_items(user_ids)
+        ShoppingListItem.objects.filter(user__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(items)
+    return len(items)
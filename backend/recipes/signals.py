@@ -0,0 +1,377 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from users.counters import decrement_counter, increment_counter
+from users.models import Follow, User
+
+from .feed import (
+    backfill_feeds,
+    fan_out_recipe,
+    prune_feeds,
+    remove_recipe_from_feeds,
+)
+from .images import release_image_files
+from .ingredient_index import invalidate_ingredient_index
+from .models import (
+    FavoritesList,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from .recipe_writes import is_writing_relations
+from .shopping_list import (
+    refresh_recipe_in_shopping_lists,
+    refresh_shopping_list,
+)
+from .tag_registry import invalidate_tag_registry
+from .user_lists import (
+    is_removing_from_list,
+    recipes_added_to_list,
+    recipes_removed_from_list,
+)
+from .user_recipe_ids import favorite_recipe_ids, shopping_cart_recipe_ids
+
+
+USER_RECIPE_IDS = {
+    FavoritesList: favorite_recipe_ids,
+    ShoppingCart: shopping_cart_recipe_ids,
+}
+# Модели, при удалении которых каскадно удаляются рецепты.
+RECIPE_DELETION_ORIGINS = (Recipe, User)
+
+
+def _is_recipe_deletion(origin) -> bool:
+    """
+    Удаление строки - часть каскадного удаления рецептов.
+
+    Производные данные рецептов в этом случае обновляются один раз в
+    обработчиках удаления самого рецепта, а не для каждой строки.
+    """
+    if isinstance(origin, QuerySet):
+        origin = origin.model
+    elif origin is not None:
+        origin = type(origin)
+    return origin is not None and issubclass(origin, RECIPE_DELETION_ORIGINS)
+
+
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def update_tags_index(sender, instance, **kwargs):
+    """
+    Пересчет индекса тегов при изменении пары рецепт-тег.
+
+    При каскадном удалении рецепта индекс не пересчитывается: рецепт
+    удаляется вместе с ним.
+    """
+    if is_writing_relations() or _is_recipe_deletion(kwargs.get('origin')):
+        return
+    Recipe.objects.filter(pk=instance.recipe_id).update_tags_index()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tags_index_on_tags_change(
+    sender,
+    instance,
+    action,
+    reverse,
+    pk_set,
+    **kwargs,
+):
+    """Пересчет индекса тегов при изменении тегов через менеджер связи."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).update_tags_index()
+        return
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = set(
+            instance.recipes.values_list('pk', flat=True),
+        )
+    elif action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_recipe_ids', set())
+    if action in ('post_add', 'post_remove', 'post_clear') and pk_set:
+        Recipe.objects.filter(pk__in=pk_set).update_tags_index()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index_on_change(sender, **kwargs):
+    """Перестроение индекса автодополнения при изменении ингредиентов."""
+    invalidate_ingredient_index()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_registry_on_change(sender, **kwargs):
+    """Перестроение реестра тегов при изменении тегов."""
+    invalidate_tag_registry()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    """Добавление ингредиентов рецепта в агрегат списка покупок."""
+    if created:
+        refresh_shopping_list(
+            [instance.user_id],
+            RecipeIngredient.objects.filter(
+                recipe_id=instance.recipe_id,
+            ).values_list(
+                'ingredient_id',
+                flat=True,
+            ),
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remember_shopping_cart_ingredients(sender, instance, origin, **kwargs):
+    """Сохранение ингредиентов рецепта перед удалением из списка покупок."""
+    if is_removing_from_list() or _is_recipe_deletion(origin):
+        return
+    instance._shopping_list_ingredient_ids = list(
+        RecipeIngredient.objects.filter(
+            recipe_id=instance.recipe_id,
+        ).values_list(
+            'ingredient_id',
+            flat=True,
+        ),
+    )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, origin, **kwargs):
+    """Удаление ингредиентов рецепта из агрегата списка покупок."""
+    if is_removing_from_list() or _is_recipe_deletion(origin):
+        return
+    refresh_shopping_list(
+        [instance.user_id],
+        instance.__dict__.pop('_shopping_list_ingredient_ids', []),
+    )
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    """Сохранение прежних рецепта и ингредиента перед изменением записи."""
+    if instance.pk is None or is_writing_relations():
+        return
+    instance._previous_recipe_ingredient = RecipeIngredient.objects.filter(
+        pk=instance.pk,
+    ).values_list(
+        'recipe_id',
+        'ingredient_id',
+    ).first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def refresh_shopping_lists_on_recipe_change(sender, instance, **kwargs):
+    """Пересчет агрегатов списков покупок при изменении рецепта."""
+    if is_writing_relations() or _is_recipe_deletion(kwargs.get('origin')):
+        return
+    previous = instance.__dict__.pop('_previous_recipe_ingredient', None)
+    if previous is None or previous[0] == instance.recipe_id:
+        ingredient_ids = {instance.ingredient_id}
+        if previous is not None:
+            ingredient_ids.add(previous[1])
+        refresh_recipe_in_shopping_lists(instance.recipe_id, ingredient_ids)
+        return
+    refresh_recipe_in_shopping_lists(previous[0], [previous[1]])
+    refresh_recipe_in_shopping_lists(
+        instance.recipe_id,
+        [instance.ingredient_id],
+    )
+
+
+@receiver(post_save, sender=FavoritesList)
+@receiver(post_delete, sender=FavoritesList)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_recipe_ids(sender, instance, **kwargs):
+    """Сброс закешированного множества id рецептов списка."""
+    if is_removing_from_list():
+        return
+    user_recipe_ids = USER_RECIPE_IDS[sender]
+    transaction.on_commit(
+        lambda: user_recipe_ids.invalidate(instance.user_id),
+    )
+
+
+@receiver(recipes_added_to_list)
+def add_recipes_to_user_lists(sender, user_id, recipe_ids, **kwargs):
+    """
+    Обновление производных данных после добавления рецептов в список.
+
+    Добавление выполняется через bulk_create без post_save, поэтому
+    множество id рецептов и агрегат списка покупок обновляются здесь.
+    """
+    user_recipe_ids = USER_RECIPE_IDS[sender]
+    transaction.on_commit(lambda: user_recipe_ids.invalidate(user_id))
+    if sender is ShoppingCart:
+        refresh_shopping_list(
+            [user_id],
+            RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids,
+            ).values_list(
+                'ingredient_id',
+                flat=True,
+            ),
+        )
+
+
+@receiver(recipes_removed_from_list)
+def remove_recipes_from_user_lists(sender, user_id, recipe_ids, **kwargs):
+    """
+    Обновление производных данных после удаления рецептов из списка.
+
+    Обработчики удаления отдельных записей при этом не выполняются,
+    поэтому множество id рецептов и агрегат списка покупок обновляются
+    здесь один раз.
+    """
+    user_recipe_ids = USER_RECIPE_IDS[sender]
+    transaction.on_commit(lambda: user_recipe_ids.invalidate(user_id))
+    if sender is ShoppingCart:
+        refresh_shopping_list(
+            [user_id],
+            RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids,
+            ).values_list(
+                'ingredient_id',
+                flat=True,
+            ),
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_shopping_lists(sender, instance, **kwargs):
+    """
+    Сохранение списков покупок с рецептом и его ингредиентов.
+
+    Строки списков покупок и ингредиентов удаляются каскадно раньше
+    самого рецепта, и их обработчики при этом не выполняются.
+    """
+    user_ids = list(
+        ShoppingCart.objects.filter(
+            recipe_id=instance.pk,
+        ).values_list(
+            'user_id',
+            flat=True,
+        ),
+    )
+    instance._shopping_lists = (
+        user_ids,
+        list(
+            RecipeIngredient.objects.filter(
+                recipe_id=instance.pk,
+            ).values_list(
+                'ingredient_id',
+                flat=True,
+            ),
+        )
+        if user_ids
+        else [],
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(sender, instance, **kwargs):
+    """Пересчет агрегатов списков покупок один раз для всего рецепта."""
+    refresh_shopping_list(*instance.__dict__.pop('_shopping_lists', ([], [])))
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image_files(sender, instance, **kwargs):
+    """Освобождение файлов изображения удаленного рецепта."""
+    transaction.on_commit(
+        lambda: release_image_files(
+            instance.image.name,
+            instance.image_variants,
+        ),
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_author(sender, instance, raw, update_fields, **kwargs):
+    """Сохранение прежнего автора рецепта перед изменением."""
+    instance.__dict__.pop('_previous_author_id', None)
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'author' not in update_fields:
+        return
+    instance._previous_author_id = Recipe.objects.filter(
+        pk=instance.pk,
+    ).values_list(
+        'author_id',
+        flat=True,
+    ).first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipes_count(sender, instance, created, raw, **kwargs):
+    """Изменение счетчика рецептов автора при создании или смене автора."""
+    if raw:
+        return
+    previous_author_id = instance.__dict__.get('_previous_author_id')
+    if created:
+        increment_counter([instance.author_id], 'recipes_count')
+    elif previous_author_id not in (None, instance.author_id):
+        decrement_counter([previous_author_id], 'recipes_count')
+        increment_counter([instance.author_id], 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшение счетчика рецептов автора при удалении рецепта."""
+    decrement_counter([instance.author_id], 'recipes_count')
+
+
+@receiver(post_save, sender=Recipe)
+def update_feeds(sender, instance, created, raw, **kwargs):
+    """Добавление рецепта в ленты подписчиков при публикации."""
+    if raw:
+        return
+    previous_author_id = instance.__dict__.get('_previous_author_id')
+    if created:
+        fan_out_recipe(instance)
+    elif previous_author_id not in (None, instance.author_id):
+        remove_recipe_from_feeds(instance.pk)
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed_on_follow(sender, instance, created, raw, **kwargs):
+    """Дополнение ленты подписчика рецептами автора при подписке."""
+    if created and not raw:
+        backfill_feeds([(instance.follower_id, instance.following_id)])
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed_on_unfollow(sender, instance, **kwargs):
+    """Удаление рецептов автора из ленты подписчика при отписке."""
+    prune_feeds([(instance.follower_id, instance.following_id)])
+
+
+@receiver(m2m_changed, sender=User.subscriptions.through)
+def backfill_feeds_on_add(
+    sender,
+    instance,
+    action,
+    reverse,
+    pk_set,
+    **kwargs,
+):
+    """Дополнение лент при подписке через менеджер связи (bulk_create)."""
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        backfill_feeds((pk, instance.pk) for pk in pk_set)
+    else:
+        backfill_feeds((instance.pk, pk) for pk in pk_set)
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+from datetime import datetime
+from typing import Iterator
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище с именами файлов по содержимому.
+
+    Файл сохраняется под именем <каталог>/<ab>/<sha256><расширение>, где
+    каталог и расширение берутся из предложенного имени. Одинаковые файлы
+    хранятся один раз, а их имена (и ссылки на них) не меняются, поэтому
+    могут кешироваться без ограничения срока.
+
+    Каждое сохранение увеличивает счетчик ссылок файла (модель
+    MediaFile), а удаление уменьшает его; файл удаляется с диска, когда
+    ссылок не остается. Файлы, не учтенные в MediaFile (сохраненные до
+    появления хранилища), не удаляются.
+
+    Файл записывается на диск до фиксации транзакции; если она
+    откатывается, файл остается без записи MediaFile. Такие файлы
+    находит find_orphans и удаляет delete_orphan (команда
+    sweep_media_files).
+    """
+
+    HASH_CHUNK_SIZE = 64 * 1024
+    CONTENT_NAME_PATTERN = re.compile(r'([0-9a-f]{2})[0-9a-f]{62}(\.\w+)?')
+
+    @property
+    def media_files(self):
+        return apps.get_model('recipes', 'MediaFile').objects
+
+    def _hash(self, content: File) -> str:
+        """SHA-256 содержимого файла."""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(self.HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = self._hash(content)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(directory, digest[:2], f'{digest}{extension}')
+        with transaction.atomic():
+            media_file, created = self.media_files.select_for_update(
+            ).get_or_create(
+                name=name,
+            )
+            if not super().exists(name):
+                super()._save(name, content)
+            self.media_files.filter(pk=media_file.pk).update(
+                refs=F('refs') + 1,
+            )
+        return name
+
+    def delete(self, name):
+        if not name:
+            return
+        with transaction.atomic():
+            media_file = self.media_files.select_for_update().filter(
+                name=name,
+            ).first()
+            if media_file is None:
+                return
+            if media_file.refs > 1:
+                self.media_files.filter(pk=media_file.pk).update(
+                    refs=F('refs') - 1,
+                )
+                return
+            media_file.delete()
+            super().delete(name)
+
+    def _is_content_name(self, directory: str, file_name: str) -> bool:
+        """Имя файла построено по содержимому (<ab>/<sha256><расширение>)."""
+        match = self.CONTENT_NAME_PATTERN.fullmatch(file_name)
+        return match is not None and (
+            os.path.basename(directory) == match.group(1)
+        )
+
+    def find_orphans(self, directory: str, before: datetime) -> Iterator[str]:
+        """
+        Файлы каталога без записи MediaFile, измененные до before.
+
+        Каталог обходится рекурсивно, рассматриваются только файлы с
+        именами по содержимому. Более новые файлы пропускаются: транзакция,
+        в которой они сохранены, может быть еще не зафиксирована.
+        """
+        if not self.exists(directory):
+            return
+        directories, files = self.listdir(directory)
+        names = [
+            os.path.join(directory, file_name)
+            for file_name in files
+            if self._is_content_name(directory, file_name)
+        ]
+        known = set(
+            self.media_files.filter(
+                name__in=names,
+            ).values_list(
+                'name',
+                flat=True,
+            ),
+        )
+        for name in names:
+            if name not in known and self.get_modified_time(name) < before:
+                yield name
+        for subdirectory in directories:
+            yield from self.find_orphans(
+                os.path.join(directory, subdirectory),
+                before,
+            )
+
+    def delete_orphan(self, name: str) -> bool:
+        """
+        Удаление файла, если для него нет записи MediaFile.
+
+        На время удаления создается заблокированная запись, поэтому
+        одновременное сохранение того же содержимого ждет завершения
+        удаления и записывает файл заново. Возвращает True, если файл
+        удален.
+        """
+        with transaction.atomic():
+            media_file, created = self.media_files.select_for_update(
+            ).get_or_create(
+                name=name,
+            )
+            if not created:
+                return False
+            super().delete(name)
+            media_file.delete()
+        return True
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_recipe_image_storage() -> ContentAddressedStorage:
+    """Хранилище изображений рецептов."""
+    return content_addressed_storage
@@ -0,0 +1,74 @@
+from typing import Iterable, Optional
+
+from .models import Tag
+from .process_cache import VersionedProcessData, invalidate_process_data
+
+
+TAG_REGISTRY_VERSION_KEY = 'tag_registry_version'
+
+
+def invalidate_tag_registry() -> None:
+    """Перестроение реестра тегов во всех процессах."""
+    invalidate_process_data(TAG_REGISTRY_VERSION_KEY)
+
+
+class TagRegistry(VersionedProcessData):
+    """
+    Реестр тегов в памяти процесса.
+
+    Все теги (id, slug, name, color) загружаются одним запросом в порядке
+    сортировки модели и используются для отображения тегов и проверки
+    слагов в фильтрах без обращения к базе данных.
+    """
+
+    version_key = TAG_REGISTRY_VERSION_KEY
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: tuple[list[Tag], dict[int, Tag], dict[str, Tag]] = (
+            [],
+            {},
+            {},
+        )
+
+    def _build(self) -> None:
+        tags = list(Tag.objects.all())
+        self._data = (
+            tags,
+            {tag.pk: tag for tag in tags},
+            {tag.slug: tag for tag in tags},
+        )
+
+    def all(self) -> list[Tag]:
+        """Все теги в порядке сортировки модели."""
+        self.refresh()
+        return self._data[0]
+
+    async def aall(self) -> list[Tag]:
+        """Асинхронный вариант all."""
+        await self.arefresh()
+        return self._data[0]
+
+    def get(self, pk: int) -> Optional[Tag]:
+        """Тег по первичному ключу."""
+        self.refresh()
+        return self._data[1].get(pk)
+
+    async def aget(self, pk: int) -> Optional[Tag]:
+        """Асинхронный вариант get."""
+        await self.arefresh()
+        return self._data[1].get(pk)
+
+    def filter_by_slugs(self, slugs: Iterable[str]) -> list[Tag]:
+        """Существующие теги с переданными слагами."""
+        self.refresh()
+        tags = self._data[2]
+        return [tags[slug] for slug in slugs if slug in tags]
+
+
+tag_registry = TagRegistry()
+
+
+def tag_slug_choices() -> list[tuple[str, str]]:
+    """Варианты выбора тега по слагу для полей форм и фильтров."""
+    return [(tag.slug, tag.name) for tag in tag_registry.all()]
@@ -0,0 +1,97 @@
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import ListModel
+
+
+# Отправляется после добавления рецептов в список одним запросом
+# (bulk_create не отправляет post_save). Аргументы: user_id, recipe_ids.
+recipes_added_to_list = Signal()
+# Отправляется после удаления рецептов из списка через remove_from_list.
+# Аргументы: user_id, recipe_ids.
+recipes_removed_from_list = Signal()
+
+_removing_from_list: ContextVar[bool] = ContextVar(
+    'removing_from_user_list',
+    default=False,
+)
+
+
+def is_removing_from_list() -> bool:
+    """
+    Признак удаления рецептов из списка через remove_from_list.
+
+    Обработчики pre_delete и post_delete отдельных записей списка в это
+    время не обновляют производные данные: их обновляют получатели
+    recipes_removed_from_list один раз для всех рецептов.
+    """
+    return _removing_from_list.get()
+
+
+def add_to_list(
+    model: type[ListModel],
+    user_id: int,
+    recipe_ids: Iterable[int],
+    ignore_conflicts: bool = False,
+) -> None:
+    """
+    Добавление рецептов в список пользователя одним INSERT.
+
+    Если ignore_conflicts не задан и рецепт уже есть в списке,
+    выбрасывается IntegrityError, а изменения откатываются. Иначе уже
+    добавленные рецепты пропускаются (ON CONFLICT DO NOTHING).
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    with transaction.atomic():
+        model.objects.bulk_create(
+            [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in recipe_ids
+            ],
+            ignore_conflicts=ignore_conflicts,
+        )
+        recipes_added_to_list.send(
+            sender=model,
+            user_id=user_id,
+            recipe_ids=recipe_ids,
+        )
+
+
+def remove_from_list(
+    model: type[ListModel],
+    user_id: int,
+    recipe_ids: Iterable[int],
+) -> int:
+    """
+    Удаление рецептов из списка пользователя одним DELETE.
+
+    У моделей списков нет каскадов, поэтому QuerySet.delete() выполняет
+    один DELETE. Обработчики удаления отдельных записей на это время
+    отключены (is_removing_from_list), производные данные обновляются
+    получателями recipes_removed_from_list. Возвращает число удаленных
+    записей.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return 0
+    token = _removing_from_list.set(True)
+    try:
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(
+                user_id=user_id,
+                recipe_id__in=recipe_ids,
+            ).delete()
+            if deleted:
+                recipes_removed_from_list.send(
+                    sender=model,
+                    user_id=user_id,
+                    recipe_ids=recipe_ids,
+                )
+    finally:
+        _removing_from_list.reset(token)
+    return deleted
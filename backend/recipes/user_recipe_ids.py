@@ -0,0 +1,129 @@
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db.models import QuerySet
+
+from .models import FavoritesList, ListModel, ShoppingCart
+
+
+USER_RECIPE_IDS_KEY = 'user_recipe_ids:{list_name}:{user_id}:{version}'
+USER_RECIPE_IDS_VERSION_KEY = 'user_recipe_ids_version:{list_name}:{user_id}'
+
+
+class UserRecipeIds:
+    """
+    Множество id рецептов из списка пользователя (избранное, покупки).
+
+    Множество загружается одним запросом при первом обращении и хранится
+    в кеше USER_RECIPE_IDS_CACHE под ключом с версией списка
+    пользователя. После изменения списка версия заменяется новой (см.
+    recipes.signals), поэтому множество, загруженное до фиксации
+    изменений, записывается под старую версию и больше не читается.
+    Кеш используется только с общим для всех процессов бэкендом
+    (USER_RECIPE_IDS_CACHE_ENABLED), иначе множество каждый раз
+    загружается из базы данных.
+    """
+
+    def __init__(self, model: type[ListModel], list_name: str) -> None:
+        self.model = model
+        self.list_name = list_name
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[settings.USER_RECIPE_IDS_CACHE]
+
+    def _get_version_key(self, user_id: int) -> str:
+        return USER_RECIPE_IDS_VERSION_KEY.format(
+            list_name=self.list_name,
+            user_id=user_id,
+        )
+
+    def _get_key(self, user_id: int, version: str) -> str:
+        return USER_RECIPE_IDS_KEY.format(
+            list_name=self.list_name,
+            user_id=user_id,
+            version=version,
+        )
+
+    def _get_queryset(self, user_id: int) -> QuerySet:
+        return self.model.objects.filter(
+            user_id=user_id,
+        ).values_list(
+            'recipe_id',
+            flat=True,
+        )
+
+    def get(self, user_id: Optional[int]) -> frozenset[int]:
+        """Id рецептов в списке пользователя."""
+        if user_id is None:
+            return frozenset()
+        if not settings.USER_RECIPE_IDS_CACHE_ENABLED:
+            return frozenset(self._get_queryset(user_id))
+        version_key = self._get_version_key(user_id)
+        version = self.cache.get(version_key)
+        if version is None:
+            self.cache.add(version_key, uuid.uuid4().hex, timeout=None)
+            version = self.cache.get(version_key)
+        key = self._get_key(user_id, version)
+        recipe_ids = self.cache.get(key)
+        if recipe_ids is None:
+            recipe_ids = frozenset(self._get_queryset(user_id))
+            self.cache.set(
+                key,
+                recipe_ids,
+                timeout=settings.USER_RECIPE_IDS_CACHE_TIMEOUT,
+            )
+        return recipe_ids
+
+    async def aget(self, user_id: Optional[int]) -> frozenset[int]:
+        """Асинхронный вариант get."""
+        if user_id is None:
+            return frozenset()
+        if not settings.USER_RECIPE_IDS_CACHE_ENABLED:
+            return frozenset(
+                [
+                    recipe_id
+                    async for recipe_id in self._get_queryset(user_id)
+                ],
+            )
+        version_key = self._get_version_key(user_id)
+        version = await self.cache.aget(version_key)
+        if version is None:
+            await self.cache.aadd(version_key, uuid.uuid4().hex, timeout=None)
+            version = await self.cache.aget(version_key)
+        key = self._get_key(user_id, version)
+        recipe_ids = await self.cache.aget(key)
+        if recipe_ids is None:
+            recipe_ids = frozenset(
+                [
+                    recipe_id
+                    async for recipe_id in self._get_queryset(user_id)
+                ],
+            )
+            await self.cache.aset(
+                key,
+                recipe_ids,
+                timeout=settings.USER_RECIPE_IDS_CACHE_TIMEOUT,
+            )
+        return recipe_ids
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Сброс множества после изменения списка.
+
+        Вызывается после фиксации транзакции: новая версия делает
+        недоступными все ранее записанные множества пользователя.
+        """
+        if settings.USER_RECIPE_IDS_CACHE_ENABLED:
+            self.cache.set(
+                self._get_version_key(user_id),
+                uuid.uuid4().hex,
+                timeout=None,
+            )
+
+
+favorite_recipe_ids = UserRecipeIds(FavoritesList, 'favorites')
+shopping_cart_recipe_ids = UserRecipeIds(ShoppingCart, 'shopping_cart')
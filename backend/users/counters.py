@@ -0,0 +1,114 @@
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Expression,
+    F,
+    IntegerField,
+    Model,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe
+
+from .models import Follow, User
+
+
+# Счетчики пользователя и связи, по которым они считаются.
+COUNTER_SOURCES = {
+    'recipes_count': (Recipe, 'author'),
+    'followers_count': (Follow, 'following'),
+    'followings_count': (Follow, 'follower'),
+}
+
+
+def increment_counter(
+    user_ids: Iterable[int],
+    field_name: str,
+    amount: int = 1,
+    **updates: Expression,
+) -> None:
+    """
+    Увеличение счетчика пользователей на amount одним UPDATE.
+
+    updates - другие поля, изменяемые тем же запросом.
+    """
+    User.objects.filter(
+        pk__in=user_ids,
+    ).update(
+        **{field_name: F(field_name) + amount},
+        **updates,
+    )
+
+
+def decrement_counter(
+    user_ids: Iterable[int],
+    field_name: str,
+    **updates: Expression,
+) -> None:
+    """Уменьшение счетчика пользователей на 1, но не меньше нуля."""
+    User.objects.filter(
+        pk__in=user_ids,
+        **{f'{field_name}__gt': 0},
+    ).update(
+        **{field_name: F(field_name) - 1},
+        **updates,
+    )
+
+
+def _count_subquery(model: type[Model], field_name: str) -> Coalesce:
+    """Подзапрос с числом строк model, ссылающихся на пользователя."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field_name: OuterRef('pk')},
+            ).order_by().values(
+                field_name,
+            ).annotate(
+                total=Count('pk'),
+            ).values(
+                'total',
+            ),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def reconcile_user_counters(user_ids: Iterable[int]) -> int:
+    """
+    Сверка счетчиков пользователей с фактическим числом записей.
+
+    Счетчики пересчитываются одним запросом и записываются только у
+    пользователей, у которых они разошлись. Возвращает число исправленных
+    пользователей.
+    """
+    with transaction.atomic():
+        users = list(
+            User.objects.select_for_update().filter(
+                pk__in=list(user_ids),
+            ).only(
+                'pk',
+                *COUNTER_SOURCES,
+            ).annotate(
+                **{
+                    f'actual_{counter}': _count_subquery(model, field_name)
+                    for counter, (model, field_name) in COUNTER_SOURCES.items()
+                },
+            ),
+        )
+        changed = []
+        for user in users:
+            is_changed = False
+            for counter in COUNTER_SOURCES:
+                actual = getattr(user, f'actual_{counter}')
+                if getattr(user, counter) != actual:
+                    setattr(user, counter, actual)
+                    is_changed = True
+            if is_changed:
+                changed.append(user)
+        User.objects.bulk_update(changed, list(COUNTER_SOURCES))
+    return len(changed)
@@ -0,0 +1,48 @@
+from typing import Any, Optional
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from users.counters import reconcile_user_counters
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Сверка счетчиков рецептов, подписчиков и подписок пользователей.
+
+    Счетчики пересчитываются частями по --chunk-size пользователей,
+    каждая часть - в отдельной транзакции; записываются только
+    разошедшиеся значения.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        last_pk = 0
+        users_count = fixed_count = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(
+                    pk__gt=last_pk,
+                ).order_by(
+                    'pk',
+                ).values_list(
+                    'pk',
+                    flat=True,
+                )[:options['chunk_size']],
+            )
+            if not user_ids:
+                break
+            fixed_count += reconcile_user_counters(user_ids)
+            users_count += len(user_ids)
+            last_pk = user_ids[-1]
+        self.stdout.write(
+            self.style.SUCCESS(
+                _(
+                    f'Счетчики пользователей сверены: пользователей - '
+                    f'{users_count}, исправлено - {fixed_count}.',
+                ),
+            ),
+        )
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.2 on 2026-10-18 01:49
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_user_counters(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Follow = apps.get_model("users", "Follow")
+    Recipe = apps.get_model("recipes", "Recipe")
+
+    def count(model, field_name):
+        return Coalesce(
+            models.Subquery(
+                model.objects.filter(**{field_name: models.OuterRef("pk")})
+                .order_by()
+                .values(field_name)
+                .annotate(total=models.Count("pk"))
+                .values("total"),
+                output_field=models.IntegerField(),
+            ),
+            0,
+        )
+
+    User.objects.update(
+        recipes_count=count(Recipe, "author"),
+        followers_count=count(Follow, "following"),
+        followings_count=count(Follow, "follower"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число подписчиков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="followings_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число подписок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="recipes_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число рецептов"
+            ),
+        ),
+        migrations.RunPython(fill_user_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_fan_out_on_read(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    User.objects.filter(
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).update(fan_out_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="fan_out_on_read",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                verbose_name="Рецепты добавляются в ленты при чтении",
+            ),
+        ),
+        migrations.RunPython(fill_fan_out_on_read, migrations.RunPython.noop),
+    ]
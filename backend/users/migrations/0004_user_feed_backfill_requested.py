@@ -0,0 +1,35 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_fan_out_on_read"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="feed_backfill_requested",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Запрошено дополнение лент подписчиков",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(
+                    ("fan_out_on_read", True),
+                    ("feed_backfill_requested__isnull", False),
+                    _connector="OR",
+                ),
+                fields=["id"],
+                name="user_feed_read_authors_idx",
+            ),
+        ),
+    ]
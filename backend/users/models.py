@@ -27,6 +27,13 @@ class User(AbstractUser):
     Уникальные поля:
     - username (имя пользователя);
     - email (адрес электронной почты).
+
+    Счетчики рецептов, подписчиков и подписок хранятся в самой модели
+    и обновляются при создании и удалении рецептов и подписок (см.
+    users.counters). Режим лент для рецептов автора (fan_out_on_read)
+    меняется вместе с числом подписчиков, feed_backfill_requested -
+    время возврата автора к записи в ленты, ленты подписчиков которого
+    еще не дополнены (см. recipes.feed).
     """
 
     password = models.CharField(_('password'), max_length=150)
@@ -52,10 +59,48 @@ class User(AbstractUser):
         related_name='user_followers',
         symmetrical=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        _('Число рецептов'),
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        _('Число подписчиков'),
+        default=0,
+        editable=False,
+    )
+    followings_count = models.PositiveIntegerField(
+        _('Число подписок'),
+        default=0,
+        editable=False,
+    )
+    fan_out_on_read = models.BooleanField(
+        _('Рецепты добавляются в ленты при чтении'),
+        default=False,
+        editable=False,
+    )
+    feed_backfill_requested = models.DateTimeField(
+        _('Запрошено дополнение лент подписчиков'),
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=(
+                    models.Q(fan_out_on_read=True)
+                    | models.Q(feed_backfill_requested__isnull=False)
+                ),
+                name='user_feed_read_authors_idx',
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.get_username()[:STR_MAX_LENGTH]
 
@@ -0,0 +1,66 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.feed import fan_out_mode_updates
+
+from .counters import decrement_counter, increment_counter
+from .models import Follow, User
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counters(sender, instance, created, raw, **kwargs):
+    """Увеличение счетчиков подписчиков и подписок при подписке."""
+    if created and not raw:
+        increment_counter([instance.follower_id], 'followings_count')
+        increment_counter(
+            [instance.following_id],
+            'followers_count',
+            **fan_out_mode_updates(1),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counters(sender, instance, **kwargs):
+    """Уменьшение счетчиков подписчиков и подписок при отписке."""
+    decrement_counter([instance.follower_id], 'followings_count')
+    decrement_counter(
+        [instance.following_id],
+        'followers_count',
+        **fan_out_mode_updates(-1),
+    )
+
+
+@receiver(m2m_changed, sender=User.subscriptions.through)
+def increment_follow_counters_on_add(
+    sender,
+    instance,
+    action,
+    reverse,
+    pk_set,
+    **kwargs,
+):
+    """
+    Увеличение счетчиков при подписке через менеджер связи.
+
+    add() создает строки Follow через bulk_create без post_save, поэтому
+    счетчики и режимы лент авторов обновляются здесь. remove() и clear()
+    удаляют строки через QuerySet.delete(), который отправляет
+    post_delete.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        increment_counter(pk_set, 'followings_count')
+        increment_counter(
+            [instance.pk],
+            'followers_count',
+            len(pk_set),
+            **fan_out_mode_updates(len(pk_set)),
+        )
+    else:
+        increment_counter(
+            pk_set,
+            'followers_count',
+            **fan_out_mode_updates(1),
+        )
+        increment_counter([instance.pk], 'followings_count', len(pk_set))